@@ -0,0 +1,5 @@
+# Módulos de apoio do Método Âncora de Valor.
+#
+# Ficam fora do script do Streamlit porque o script é reexecutado a cada
+# interação, enquanto módulos importados (e seus caches) vivem pelo
+# processo inteiro.
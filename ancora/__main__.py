@@ -0,0 +1,6 @@
+# Permite rodar `python -m ancora <comando>`
+import sys
+
+from ancora.cli import main
+
+sys.exit(main())
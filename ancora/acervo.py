@@ -0,0 +1,161 @@
+# Acervo dos planos concluídos, para análise agregada: cada plano vira um
+# registro binário de tamanho fixo, acrescentado ao fim de um arquivo (nunca
+# reescrito). Só números e categorias: nenhum texto livre do usuário.
+# Desligado por padrão; liga com ANCORA_ACERVO=<pasta>.
+#
+# Na pasta:
+#   planos-v1.bin    registros (REGISTRO), lidos de uma vez como array NumPy
+#   profissoes.txt   nome de cada código de profissão, um por linha
+#   moedas.txt       nome de cada posição do campo `moedas`
+import math
+import os
+import re
+import struct
+import threading
+import time
+from functools import lru_cache
+
+# Registro de um plano (little-endian, sem alinhamento):
+#   data             segundos desde 1970
+#   profissao        código em profissoes.txt
+#   preco_*          em reais; NaN quando o texto não é um valor (ex.: "6%")
+#   parc_*           número de parcelas; 0 quando em branco
+#   moedas           prioridade (0-2) de cada moeda de moedas.txt; -1 = não escolhida
+MAX_MOEDAS = 16
+CAMPOS = (
+    ('data', '<i8'),
+    ('profissao', '<i4'),
+    ('preco_principal', '<f8'),
+    ('preco_min', '<f8'),
+    ('preco_max', '<f8'),
+    ('parc_min', '<i2'),
+    ('parc_max', '<i2'),
+    ('moedas', 'i1', (MAX_MOEDAS,)),
+)
+REGISTRO = struct.Struct(f'<qi3d2h{MAX_MOEDAS}b')
+ARQUIVO_PLANOS = 'planos-v1.bin'
+
+_NUMERO = re.compile(r'\d[\d.,]*')
+_MILHAR = re.compile(r'\s*(mil\b|k\b)', re.IGNORECASE)
+
+
+# Parte inteira sem o separador de milhar; None se os grupos não forem de
+# três dígitos ("1.200.000" sim, "1.5.0" não)
+def _sem_milhar(inteiro, separador):
+    grupos = inteiro.split(separador)
+    if len(grupos) > 1 and not (len(grupos[0]) <= 3 and all(len(g) == 3 for g in grupos[1:])):
+        return None
+    return ''.join(grupos)
+
+
+# Valor em reais de um preço digitado: "R$ 1.200,00", "1200", "R$ 3,5 mil",
+# "1.200" (ponto de milhar), "12.50" (ponto decimal) ou "1,200.50" (formato
+# americano: com os dois separadores, o último é o decimal). Porcentagens,
+# textos sem número e números que não dá para ler ("1.5.0") dão NaN. Preços
+# se repetem muito, então o resultado fica em cache.
+@lru_cache(maxsize=8192)
+def ler_preco(texto):
+    if '%' in texto:
+        return math.nan
+    achado = _NUMERO.search(texto)
+    if achado is None:
+        return math.nan
+    numero = achado.group().rstrip('.,')
+    virgula, ponto = numero.rfind(','), numero.rfind('.')
+    if virgula >= 0 and ponto >= 0:
+        decimal, milhar = (',', '.') if virgula > ponto else ('.', ',')
+        inteiro, _, decimais = numero.rpartition(decimal)
+        inteiro = _sem_milhar(inteiro, milhar)
+    elif virgula >= 0 and numero.count(',') == 1:
+        inteiro, _, decimais = numero.partition(',')
+    elif ponto >= 0 and numero.count('.') == 1 and len(numero) - ponto - 1 != 3:
+        inteiro, _, decimais = numero.partition('.')
+    else:
+        inteiro, decimais = _sem_milhar(numero, ',' if virgula >= 0 else '.'), '0'
+    if inteiro is None:
+        return math.nan
+    try:
+        valor = float(f"{inteiro}.{decimais}")
+    except ValueError:
+        return math.nan
+    if _MILHAR.match(texto, achado.end()):
+        valor *= 1000
+    return valor
+
+
+# Número de parcelas: "6x", "até 12 vezes", "à vista" (1); 0 se em branco
+@lru_cache(maxsize=1024)
+def ler_parcelas(texto):
+    achado = re.search(r'\d+', texto)
+    if achado:
+        return min(int(achado.group()), 32767)
+    return 1 if 'vista' in texto.lower() else 0
+
+
+class Acervo:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._profissoes = self._ler_nomes('profissoes.txt')
+        self._moedas = self._ler_nomes('moedas.txt')
+
+    def _ler_nomes(self, arquivo):
+        try:
+            with open(os.path.join(self.pasta, arquivo), 'r', encoding='utf-8') as f:
+                return {nome: i for i, nome in enumerate(f.read().splitlines())}
+        except FileNotFoundError:
+            return {}
+
+    # Chamar com o lock: código do nome, acrescentando-o ao dicionário se novo
+    def _codigo(self, nomes, arquivo, nome):
+        nome = ' '.join(nome.split())
+        codigo = nomes.get(nome)
+        if codigo is None:
+            codigo = nomes[nome] = len(nomes)
+            with open(os.path.join(self.pasta, arquivo), 'a', encoding='utf-8') as f:
+                f.write(nome + '\n')
+        return codigo
+
+    def registro(self, dados, moedas_selecionadas, data=None):
+        prioridades = [-1] * MAX_MOEDAS
+        with self._lock:
+            profissao = self._codigo(self._profissoes, 'profissoes.txt', dados.get('profissao', ''))
+            for nome, info in moedas_selecionadas.items():
+                if nome in self._moedas or len(self._moedas) < MAX_MOEDAS:
+                    prioridades[self._codigo(self._moedas, 'moedas.txt', nome)] = info['prioridade_index']
+        return REGISTRO.pack(
+            int(time.time() if data is None else data), profissao,
+            ler_preco(dados.get('preco_principal', '')), ler_preco(dados.get('preco_min', '')),
+            ler_preco(dados.get('preco_max', '')),
+            ler_parcelas(dados.get('parc_min', '')), ler_parcelas(dados.get('parc_max', '')),
+            *prioridades
+        )
+
+    # Acrescenta registros já montados (um ou vários planos de uma vez)
+    def acrescentar(self, registros):
+        with self._lock:
+            with open(os.path.join(self.pasta, ARQUIVO_PLANOS), 'ab') as f:
+                f.write(registros)
+
+    def arquivar(self, dados, moedas_selecionadas):
+        self.acrescentar(self.registro(dados, moedas_selecionadas))
+
+
+# Um acervo por pasta, compartilhado entre as sessões
+@lru_cache(maxsize=None)
+def acervo(pasta):
+    return Acervo(pasta)
+
+
+# Guarda um plano concluído no acervo configurado (não faz nada sem
+# ANCORA_ACERVO). O acervo é só para análise: nenhuma falha (disco, plano
+# fora do esperado) chega ao usuário.
+def arquivar_plano(dados, moedas_selecionadas):
+    pasta = os.environ.get('ANCORA_ACERVO')
+    if not pasta:
+        return
+    try:
+        acervo(pasta).arquivar(dados, moedas_selecionadas)
+    except Exception:
+        pass
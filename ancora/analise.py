@@ -0,0 +1,127 @@
+# Análise agregada do acervo de planos com NumPy. O arquivo é lido de uma
+# vez como array de registros e cada medida é uma operação sobre colunas
+# inteiras, sem laço por plano.
+import os
+import sys
+
+import numpy as np
+
+from ancora.acervo import ARQUIVO_PLANOS, CAMPOS, REGISTRO
+from ancora.plano import PRIORIDADES
+
+TIPO_REGISTRO = np.dtype(list(CAMPOS))
+assert TIPO_REGISTRO.itemsize == REGISTRO.size
+
+
+def _ler_nomes(pasta, arquivo):
+    try:
+        with open(os.path.join(pasta, arquivo), 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+# Lê o acervo: (planos, nomes das profissões, nomes das moedas). Um registro
+# pela metade no fim (gravação interrompida) é ignorado.
+def carregar_acervo(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_PLANOS)
+    try:
+        quantidade = os.path.getsize(caminho) // TIPO_REGISTRO.itemsize
+    except FileNotFoundError:
+        quantidade = 0
+    if quantidade:
+        planos = np.fromfile(caminho, dtype=TIPO_REGISTRO, count=quantidade)
+    else:
+        planos = np.empty(0, dtype=TIPO_REGISTRO)
+    return planos, _ler_nomes(pasta, 'profissoes.txt'), _ler_nomes(pasta, 'moedas.txt')
+
+
+# Percentis por grupo de um array já ordenado por (grupo, valor): pega o
+# elemento na posição do percentil dentro de cada faixa
+def _percentis_grupos(valores, inicios, fins, p):
+    posicoes = inicios + np.floor((fins - inicios - 1) * p / 100).astype(np.int64)
+    return valores[posicoes]
+
+
+# Preço da âncora (meio da faixa mín-máx) em % do preço principal, por profissão
+def ancora_por_profissao(planos, profissoes):
+    principal = planos['preco_principal']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual = (planos['preco_min'] + planos['preco_max']) / 2 / principal * 100
+    validos = np.isfinite(percentual) & (principal > 0)
+    codigos = planos['profissao'][validos]
+    valores = percentual[validos]
+    if not len(valores):
+        return []
+    ordem = np.lexsort((valores, codigos))
+    codigos, valores = codigos[ordem], valores[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    fins = np.r_[inicios[1:], len(codigos)]
+    p25, p50, p75 = (_percentis_grupos(valores, inicios, fins, p) for p in (25, 50, 75))
+    resultado = [
+        {'profissao': profissoes[c] if c < len(profissoes) else f'#{c}', 'planos': int(n),
+         'p25': float(a), 'mediana': float(b), 'p75': float(d)}
+        for c, n, a, b, d in zip(codigos[inicios], fins - inicios, p25, p50, p75)
+    ]
+    return sorted(resultado, key=lambda r: -r['planos'])
+
+
+# Quantas vezes cada moeda é escolhida e em qual prioridade
+def uso_moedas(planos, moedas):
+    prioridades = planos['moedas'][:, :len(moedas)]
+    total = max(len(planos), 1)
+    por_prioridade = np.stack([(prioridades == p).sum(axis=0) for p in range(len(PRIORIDADES))], axis=1)
+    escolhas = por_prioridade.sum(axis=1)
+    resultado = [
+        {'moeda': nome, 'planos': int(n), 'percentual': float(n / total * 100),
+         'por_prioridade': [int(x) for x in contagens]}
+        for nome, n, contagens in zip(moedas, escolhas, por_prioridade)
+    ]
+    return sorted(resultado, key=lambda r: -r['planos'])
+
+
+# Faixas de parcelamento (mín-máx) mais comuns, entre os planos que têm
+def faixas_parcelamento(planos, limite=10):
+    minimo = planos['parc_min'].astype(np.int32)
+    maximo = planos['parc_max'].astype(np.int32)
+    com = (minimo > 0) | (maximo > 0)
+    faixas, contagens = np.unique(minimo[com] * 65536 + maximo[com], return_counts=True)
+    ordem = np.argsort(-contagens, kind='stable')[:limite]
+    return {
+        'planos_com_parcelamento': int(com.sum()),
+        'mediana_min': float(np.median(minimo[com])) if com.any() else 0.0,
+        'mediana_max': float(np.median(maximo[com])) if com.any() else 0.0,
+        'faixas': [{'min': int(faixas[i] // 65536), 'max': int(faixas[i] % 65536), 'planos': int(contagens[i])}
+                   for i in ordem]
+    }
+
+
+def resumir_acervo(pasta, limite=10):
+    planos, profissoes, moedas = carregar_acervo(pasta)
+    return {
+        'planos': len(planos),
+        'ancora_por_profissao': ancora_por_profissao(planos, profissoes),
+        'moedas': uso_moedas(planos, moedas),
+        'parcelamento': faixas_parcelamento(planos, limite)
+    }
+
+
+def imprimir_resumo(resumo, limite=10, saida=None):
+    saida = saida or sys.stdout
+    saida.write(f"Planos no acervo: {resumo['planos']}\n")
+
+    saida.write("\nÂncora em % do preço principal (p25 / mediana / p75)\n")
+    for r in resumo['ancora_por_profissao'][:limite]:
+        saida.write(f"  {r['profissao'][:36]:<36}{r['planos']:>9}  "
+                    f"{r['p25']:>6.1f}%{r['mediana']:>7.1f}%{r['p75']:>7.1f}%\n")
+
+    saida.write("\nMoedas de troca (planos que escolheram; 1ª / 2ª / 3ª prioridade)\n")
+    for r in resumo['moedas']:
+        prioridades = ' / '.join(str(n) for n in r['por_prioridade'])
+        saida.write(f"  {r['moeda'][:36]:<36}{r['percentual']:>6.1f}%  {prioridades}\n")
+
+    parcelamento = resumo['parcelamento']
+    saida.write(f"\nParcelamento: {parcelamento['planos_com_parcelamento']} planos, mediana "
+                f"{parcelamento['mediana_min']:g}x a {parcelamento['mediana_max']:g}x\n")
+    for faixa in parcelamento['faixas']:
+        saida.write(f"  {faixa['min']}x - {faixa['max']}x{faixa['planos']:>12}\n")
@@ -0,0 +1,51 @@
+# Arquivo de dados (usuários, profissões) lido uma vez e relido só quando
+# muda, compartilhado entre todas as sessões. Quem usa informa a função que
+# interpreta o arquivo aberto; o resultado dela é o valor servido.
+import os
+import threading
+from functools import lru_cache
+
+
+class ArquivoVigiado:
+    # `interpretar(f)` monta o valor a partir do arquivo aberto; `inicial` vale
+    # até a primeira leitura que der certo. Exceções em `erros` (arquivo
+    # malformado) mantêm a versão anterior e ficam em `erro`; as demais
+    # (ex.: FileNotFoundError) sobem para quem chamou.
+    def __init__(self, caminho, interpretar, inicial, erros=(), newline=None):
+        self.caminho = caminho
+        self._interpretar = interpretar
+        self._valor = inicial
+        self._erros = erros
+        self._newline = newline
+        self._assinatura = None
+        self._lock = threading.Lock()
+        # Erro da última leitura, ou None
+        self.erro = None
+
+    # mtime + tamanho identificam a versão do arquivo sem precisar lê-lo
+    def _assinatura_atual(self):
+        info = os.stat(self.caminho)
+        return info.st_mtime_ns, info.st_size
+
+    # Retorna o valor atual, recarregando se o arquivo mudou. O valor
+    # devolvido nunca é alterado: uma recarga monta outro e troca a
+    # referência, então quem está lendo continua com uma versão inteira.
+    def valor(self):
+        assinatura = self._assinatura_atual()
+        if assinatura != self._assinatura:
+            with self._lock:
+                if assinatura != self._assinatura:
+                    try:
+                        with open(self.caminho, 'r', encoding='utf-8', newline=self._newline) as f:
+                            self._valor = self._interpretar(f)
+                        self.erro = None
+                    except self._erros as e:
+                        self.erro = f"{type(e).__name__}: {e}"
+                    self._assinatura = assinatura
+        return self._valor
+
+
+# Uma instância por (classe, arquivo), compartilhada entre todas as sessões
+@lru_cache(maxsize=None)
+def arquivo_vigiado(classe, caminho):
+    return classe(caminho)
@@ -0,0 +1,257 @@
+# Registro de auditoria: logins (aceitos, negados, expirados) e uso (planos e
+# imagens por cliente), em JSON lines. Quem registra só põe o evento num
+# buffer em memória; uma thread de fundo grava em lotes, com um fsync por
+# lote, e gira o arquivo pelo tamanho. Desligado por padrão; liga com
+# ANCORA_AUDITORIA=<arquivo>.
+#
+#   ANCORA_AUDITORIA=auditoria.jsonl   arquivo do log
+#   ANCORA_AUDITORIA_MB=50             tamanho para girar (arquivo.1, .2, ...)
+#   ANCORA_AUDITORIA_ARQUIVOS=5        arquivos girados mantidos
+#   ANCORA_AUDITORIA_BUFFER=10000      eventos em memória à espera do disco
+#
+# Com o disco lento e o buffer cheio, os eventos mais antigos do buffer são
+# descartados (o clique nunca espera o disco). A quantidade descartada vai
+# para o log num evento `descarte`.
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+from ancora.metricas import registrar_medidor
+
+# Eventos que acordam a thread antes do intervalo
+LOTE = 256
+
+# Segundos máximos entre a chegada de um evento e a gravação
+INTERVALO_GRAVACAO = 1.0
+
+
+class Auditoria:
+    def __init__(self, caminho, limite_bytes, arquivos, capacidade):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.arquivos = arquivos
+        self._buffer = deque(maxlen=capacidade)
+        self._condicao = threading.Condition()
+        self._descartados = 0
+        self._encerrar = False
+        # Contadores do processo, para o medidor de métricas
+        self.gravados = 0
+        self.descartados_total = 0
+        self.erros = 0
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self._thread = threading.Thread(target=self._laco, name='auditoria', daemon=True)
+        self._thread.start()
+
+    def registrar(self, tipo, campos):
+        evento = {'t': round(time.time(), 3), 'tipo': tipo, **campos}
+        with self._condicao:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._descartados += 1
+            self._buffer.append(evento)
+            if len(self._buffer) >= LOTE:
+                self._condicao.notify()
+
+    # Espera juntar um lote (ou o intervalo passar) e esvazia o buffer: um
+    # fsync vale para todos os eventos do lote
+    def _retirar(self):
+        with self._condicao:
+            self._condicao.wait_for(lambda: len(self._buffer) >= LOTE or self._encerrar, INTERVALO_GRAVACAO)
+            eventos = list(self._buffer)
+            self._buffer.clear()
+            descartados, self._descartados = self._descartados, 0
+        if descartados:
+            eventos.append({'t': round(time.time(), 3), 'tipo': 'descarte', 'eventos': descartados})
+            self.descartados_total += descartados
+        return eventos
+
+    def _laco(self):
+        while True:
+            encerrar = self._encerrar
+            eventos = self._retirar()
+            if eventos:
+                try:
+                    self._gravar(eventos)
+                except OSError:
+                    # Auditoria nunca derruba o app; o lote se perde
+                    self.erros += 1
+            if encerrar:
+                return
+
+    def _gravar(self, eventos):
+        conteudo = ''.join(json.dumps(e, ensure_ascii=False, separators=(',', ':')) + '\n' for e in eventos)
+        with open(self.caminho, 'a', encoding='utf-8') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+            tamanho = f.tell()
+        self.gravados += len(eventos)
+        if tamanho >= self.limite_bytes:
+            self._girar()
+
+    # arquivo -> arquivo.1 -> arquivo.2 ...; o mais antigo sai
+    def _girar(self):
+        for i in range(self.arquivos - 1, 0, -1):
+            origem = f"{self.caminho}.{i}"
+            if os.path.exists(origem):
+                os.replace(origem, f"{self.caminho}.{i + 1}")
+        if self.arquivos > 0:
+            os.replace(self.caminho, f"{self.caminho}.1")
+        else:
+            os.remove(self.caminho)
+
+    # Grava o que estiver no buffer e para a thread (chamado na saída)
+    def encerrar(self, tempo_limite=5):
+        with self._condicao:
+            self._encerrar = True
+            self._condicao.notify()
+        self._thread.join(tempo_limite)
+
+    def estatisticas(self):
+        with self._condicao:
+            pendentes = len(self._buffer)
+        return {'pendentes': pendentes, 'gravados': self.gravados,
+                'descartados': self.descartados_total, 'erros': self.erros}
+
+
+# Uma auditoria por processo, criada no primeiro evento
+@lru_cache(maxsize=1)
+def auditoria():
+    caminho = os.environ.get('ANCORA_AUDITORIA')
+    if not caminho:
+        return None
+    registro = Auditoria(
+        caminho,
+        limite_bytes=int(float(os.environ.get('ANCORA_AUDITORIA_MB', '50')) * 1024 * 1024),
+        arquivos=int(os.environ.get('ANCORA_AUDITORIA_ARQUIVOS', '5')),
+        capacidade=int(os.environ.get('ANCORA_AUDITORIA_BUFFER', '10000'))
+    )
+    atexit.register(registro.encerrar)
+    registrar_medidor('auditoria', registro.estatisticas)
+    return registro
+
+
+# Uso: registrar_evento('login', email=..., resultado='negado'). Sem
+# ANCORA_AUDITORIA, não faz nada.
+def registrar_evento(tipo, **campos):
+    registro = auditoria()
+    if registro is not None:
+        registro.registrar(tipo, campos)
+
+
+# Arquivos do log do mais antigo ao mais novo (girados primeiro)
+def arquivos_log(caminho):
+    girados = []
+    i = 1
+    while os.path.exists(f"{caminho}.{i}"):
+        girados.append(f"{caminho}.{i}")
+        i += 1
+    return girados[::-1] + ([caminho] if os.path.exists(caminho) else [])
+
+
+# Eventos do log, um por vez, sem carregar os arquivos inteiros. Linhas
+# quebradas (ex.: gravação interrompida) são puladas.
+def ler_eventos(caminho, desde=None, tipo=None, email=None):
+    if email is not None:
+        email = email.strip().lower()
+    for arquivo in arquivos_log(caminho):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    continue
+                if desde is not None and evento.get('t', 0) < desde:
+                    continue
+                if tipo is not None and evento.get('tipo') != tipo:
+                    continue
+                if email is not None and evento.get('email') != email:
+                    continue
+                yield evento
+
+
+# Falhas de login do mesmo email dentro de JANELA_RAJADA segundos que contam
+# como rajada (provável tentativa de adivinhar o código)
+FALHAS_RAJADA = 5
+JANELA_RAJADA = 600
+
+
+# Agrega um fluxo de eventos: totais por tipo e resultado, rajadas de login
+# negado, tentativas com acesso expirado e planos/imagens por cliente
+def resumir_eventos(eventos, limite=10):
+    por_tipo = {}
+    falhas = {}
+    rajadas = {}
+    expirados = {}
+    uso = {}
+    descartados = 0
+    primeiro = ultimo = None
+    for evento in eventos:
+        tipo = evento.get('tipo')
+        t = evento.get('t', 0)
+        primeiro = t if primeiro is None else primeiro
+        ultimo = t
+        chave = f"{tipo}:{evento['resultado']}" if 'resultado' in evento else tipo
+        por_tipo[chave] = por_tipo.get(chave, 0) + 1
+        email = evento.get('email')
+        if tipo == 'descarte':
+            descartados += evento.get('eventos', 0)
+        elif tipo == 'login' and evento.get('resultado') == 'negado':
+            recentes = falhas.setdefault(email, deque())
+            recentes.append(t)
+            while recentes and recentes[0] < t - JANELA_RAJADA:
+                recentes.popleft()
+            if len(recentes) >= FALHAS_RAJADA:
+                rajadas[email] = rajadas.get(email, 0) + 1
+                recentes.clear()
+        elif tipo == 'login' and evento.get('resultado') == 'expirado':
+            expirados[email] = expirados.get(email, 0) + 1
+        elif tipo in ('plano', 'imagem') and evento.get('resultado') != 'fila_cheia':
+            contagem = uso.setdefault(email, {'plano': 0, 'imagem': 0})
+            contagem[tipo] += 1
+
+    def maiores(contagens, chave=None):
+        return sorted(contagens.items(), key=chave or (lambda item: -item[1]))[:limite]
+
+    return {
+        'primeiro': primeiro,
+        'ultimo': ultimo,
+        'eventos': sum(por_tipo.values()),
+        'por_tipo': dict(sorted(por_tipo.items())),
+        'descartados': descartados,
+        'rajadas': maiores(rajadas),
+        'expirados': maiores(expirados),
+        'uso': maiores(uso, lambda item: (-item[1]['imagem'], -item[1]['plano']))
+    }
+
+
+def _data(t):
+    return datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S') if t else '-'
+
+
+def imprimir_resumo(resumo, saida=None):
+    saida = saida or sys.stdout
+    saida.write(f"Eventos: {resumo['eventos']} ({_data(resumo['primeiro'])} a {_data(resumo['ultimo'])})\n")
+    for chave, n in resumo['por_tipo'].items():
+        saida.write(f"  {chave:<28}{n:>10}\n")
+    if resumo['descartados']:
+        saida.write(f"⚠️ {resumo['descartados']} eventos descartados com o buffer cheio\n")
+
+    saida.write(f"\nRajadas de login negado ({FALHAS_RAJADA}+ em {JANELA_RAJADA // 60} min)\n")
+    for email, n in resumo['rajadas']:
+        saida.write(f"  {email:<40}{n:>6}\n")
+
+    saida.write("\nTentativas com acesso expirado\n")
+    for email, n in resumo['expirados']:
+        saida.write(f"  {email:<40}{n:>6}\n")
+
+    saida.write("\nUso por cliente (imagens / planos)\n")
+    for email, contagem in resumo['uso']:
+        saida.write(f"  {email:<40}{contagem['imagem']:>6}{contagem['plano']:>6}\n")
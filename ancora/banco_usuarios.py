@@ -0,0 +1,138 @@
+# Base de usuários em SQLite (opcional), para muitos clientes e renovações
+# sem reescrever o usuarios.txt
+import errno
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from urllib.request import pathname2url
+
+from ancora.usuarios import FORMATO_DATA, ler_linha
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    email TEXT PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    expiracao DATE
+) WITHOUT ROWID
+"""
+
+UPSERT = """
+INSERT INTO usuarios (email, codigo, expiracao) VALUES (?, ?, ?)
+ON CONFLICT(email) DO UPDATE SET codigo = excluded.codigo, expiracao = excluded.expiracao
+"""
+
+
+class BancoUsuarios:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        # sqlite3 não compartilha conexões entre threads: uma por thread
+        self._local = threading.local()
+
+    # Só `importar` cria o banco: nos logins, um caminho errado em
+    # ANCORA_USUARIOS_DB dá FileNotFoundError em vez de um banco vazio que
+    # nega todo mundo
+    def _conexao(self, criar=False):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            modo = 'rwc' if criar else 'rw'
+            try:
+                con = sqlite3.connect(f"file:{pathname2url(self.caminho)}?mode={modo}", uri=True, timeout=30)
+            except sqlite3.OperationalError:
+                if not os.path.exists(self.caminho):
+                    raise FileNotFoundError(errno.ENOENT, "banco de usuários não encontrado", self.caminho) from None
+                raise
+            # WAL deixa os logins lendo enquanto uma importação escreve
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.con = con
+        return con
+
+    # Uma consulta pela chave primária por login
+    def buscar(self, email):
+        linha = self._conexao().execute(
+            'SELECT codigo, expiracao FROM usuarios WHERE email = ?',
+            (email.strip().lower(),)
+        ).fetchone()
+        if linha is None:
+            return None
+        codigo, expiracao = linha
+        try:
+            expiracao = datetime.strptime(expiracao, FORMATO_DATA)
+        except (TypeError, ValueError):
+            expiracao = None
+        return {'codigo': codigo, 'expiracao': expiracao}
+
+    # Cria ou atualiza um usuário (renovação = nova data de expiração)
+    def salvar(self, email, codigo, expiracao):
+        with self._conexao() as con:
+            con.execute(UPSERT, (email.strip().lower(), codigo.strip(), _data_texto(expiracao)))
+
+    def renovar(self, email, expiracao):
+        with self._conexao() as con:
+            cur = con.execute(
+                'UPDATE usuarios SET expiracao = ? WHERE email = ?',
+                (_data_texto(expiracao), email.strip().lower())
+            )
+        return cur.rowcount > 0
+
+    def total(self):
+        return self._conexao().execute('SELECT COUNT(*) FROM usuarios').fetchone()[0]
+
+    # Importa linhas no formato do usuarios.txt em lotes, uma transação por lote.
+    # Com sincronizar=True, remove do banco quem não está mais no arquivo.
+    # Retorna (importadas, ignoradas, removidas).
+    def importar(self, linhas, lote=5000, sincronizar=False):
+        con = self._conexao(criar=True)
+        with con:
+            con.execute(ESQUEMA)
+        importadas = ignoradas = removidas = 0
+        if sincronizar:
+            con.execute('CREATE TEMP TABLE IF NOT EXISTS importados (email TEXT PRIMARY KEY) WITHOUT ROWID')
+            con.execute('DELETE FROM importados')
+        pendentes = []
+
+        def gravar():
+            with con:
+                con.executemany(UPSERT, pendentes)
+                if sincronizar:
+                    con.executemany('INSERT OR IGNORE INTO importados VALUES (?)', [(p[0],) for p in pendentes])
+            pendentes.clear()
+
+        for linha in linhas:
+            if not linha.strip():
+                continue
+            registro = ler_linha(linha)
+            if registro is None:
+                ignoradas += 1
+                continue
+            email, codigo, expiracao = registro
+            pendentes.append((email, codigo, _data_texto(expiracao)))
+            importadas += 1
+            if len(pendentes) >= lote:
+                gravar()
+        if pendentes:
+            gravar()
+
+        if sincronizar:
+            with con:
+                removidas = con.execute(
+                    'DELETE FROM usuarios WHERE email NOT IN (SELECT email FROM importados)'
+                ).rowcount
+                con.execute('DELETE FROM importados')
+        return importadas, ignoradas, removidas
+
+
+def _data_texto(data):
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return datetime.strptime(data.strip(), FORMATO_DATA).strftime(FORMATO_DATA)
+    return data.strftime(FORMATO_DATA)
+
+
+# Um banco por caminho, compartilhado entre todas as sessões
+@lru_cache(maxsize=None)
+def banco_usuarios(caminho):
+    return BancoUsuarios(caminho)
@@ -0,0 +1,384 @@
+# Benchmarks sem navegador: geração da imagem, codificação, login e um
+# passo a passo completo do app pelo AppTest do Streamlit
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from ancora.catalogo import MOEDAS
+from ancora.exportar import FORMATOS, codificar
+from ancora.imagem import VERSAO_RENDER, bloco_secao, gerar_arquivo, gerar_imagem_resultado
+from ancora.plano import PRIORIDADES
+from ancora.usuarios import IndiceUsuarios, validar_acesso
+from ancora.variantes import gerar_variantes
+from ancora.vetor import FORMATOS_VETOR, gerar_vetor
+
+SCRIPT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'metodo_ancora.py')
+
+MOEDAS_EXEMPLO = MOEDAS
+
+DADOS_EXEMPLO = {
+    'profissao': 'Dentista',
+    'oferta_principal': 'Clareamento dental completo',
+    'preco_principal': 'R$ 1.200,00',
+    'nome_ancora': 'Kit de manutenção (pasta, gel, moldeira)',
+    'preco_min': 'R$ 200,00',
+    'preco_max': 'R$ 400,00',
+    'parc_min': '2x',
+    'parc_max': '6x'
+}
+
+# Tamanhos dos arquivos de usuários sintéticos
+TAMANHOS_USUARIOS = [10, 10_000, 1_000_000]
+
+# Planos no acervo sintético da análise
+PLANOS_ACERVO = 1_000_000
+
+
+# Plano de exemplo com as n primeiras moedas
+def plano_exemplo(n_moedas):
+    moedas = {}
+    for i, nome in enumerate(MOEDAS_EXEMPLO[:n_moedas]):
+        indice = i % len(PRIORIDADES)
+        moedas[nome] = {
+            'descricao': f"Concessão de exemplo número {i + 1} para {nome.lower()}, sem desconto no preço",
+            'prioridade': PRIORIDADES[indice],
+            'prioridade_index': indice
+        }
+    return dict(DADOS_EXEMPLO), moedas
+
+
+# Estatísticas de uma lista de tempos (em ms)
+def resumir(tempos):
+    ordenados = sorted(tempos)
+
+    def percentil(p):
+        return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+    return {
+        'n': len(ordenados),
+        'mediana_ms': statistics.median(ordenados),
+        'media_ms': statistics.fmean(ordenados),
+        'min_ms': ordenados[0],
+        'p90_ms': percentil(90),
+        'p99_ms': percentil(99),
+        'max_ms': ordenados[-1]
+    }
+
+
+# Executa `funcao` repetidamente e devolve os tempos em ms
+def medir(funcao, repeticoes, aquecimento=1):
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def gerar_arquivo_usuarios(pasta, n):
+    caminho = os.path.join(pasta, f'usuarios-{n}.txt')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(f"cliente{i}@exemplo.com,ALN{i:07d},2099-12-31\n")
+    return caminho
+
+
+# Render de um plano novo: o cache de blocos é esvaziado a cada vez, senão
+# a partir da segunda repetição só se mediria a colagem dos blocos prontos
+def _sem_blocos(funcao):
+    def executar():
+        bloco_secao.cache_clear()
+        return funcao()
+    return executar
+
+
+def bench_render(repeticoes):
+    resultados = {}
+    for n in (1, 3, 7):
+        dados, moedas = plano_exemplo(n)
+        resultados[f'render_{n}_moedas'] = medir(_sem_blocos(lambda: gerar_imagem_resultado(dados, moedas)), repeticoes)
+    img = gerar_imagem_resultado(*plano_exemplo(3))
+    for formato in FORMATOS:
+        resultados[f'codificar_{formato}'] = medir(lambda: codificar(img, formato), repeticoes)
+    return resultados
+
+
+# Exportações (vetorial e variantes de tamanho) contra o caminho raster
+# completo (desenho + JPEG), com 3 moedas. Os tamanhos vão para `meta`.
+def bench_vetor(repeticoes, meta):
+    dados, moedas = plano_exemplo(3)
+    resultados = {'arquivo_jpeg_3_moedas': medir(_sem_blocos(lambda: gerar_arquivo(dados, moedas)), repeticoes)}
+    tamanhos = {'jpeg': len(gerar_arquivo(dados, moedas))}
+    for formato in FORMATOS_VETOR:
+        resultados[f'arquivo_{formato}_3_moedas'] = medir(lambda: gerar_vetor(dados, moedas, formato), repeticoes)
+        tamanhos[formato] = len(gerar_vetor(dados, moedas, formato))
+    meta['bytes_3_moedas'] = tamanhos
+    # Stories, feed e A4 de um mesmo layout (o que um pedido do ZIP ocupa na fila)
+    resultados['variantes_jpeg_3_moedas'] = medir(lambda: gerar_variantes(dados, moedas), repeticoes)
+    return resultados
+
+
+def bench_usuarios(repeticoes, tamanhos, pasta):
+    resultados = {}
+    aleatorio = random.Random(42)
+    for n in tamanhos:
+        caminho = gerar_arquivo_usuarios(pasta, n)
+        # Carga completa do arquivo (o que acontece quando ele muda)
+        repeticoes_carga = max(1, repeticoes // 10) if n >= 1_000_000 else repeticoes
+        resultados[f'carregar_usuarios_{n}'] = medir(
+            lambda: IndiceUsuarios(caminho).usuarios(), repeticoes_carga, aquecimento=0
+        )
+        # Login com o índice já carregado: metade válidos, metade inexistentes
+        indice = IndiceUsuarios(caminho)
+        indice.usuarios()
+        tentativas = []
+        for _ in range(1000):
+            i = aleatorio.randrange(n)
+            if aleatorio.random() < 0.5:
+                tentativas.append((f"cliente{i}@exemplo.com", f"ALN{i:07d}"))
+            else:
+                tentativas.append((f"outro{i}@exemplo.com", "XYZ"))
+        proxima = iter(tentativas * (repeticoes * 10 // len(tentativas) + 2))
+        resultados[f'validar_acesso_{n}'] = medir(
+            lambda: validar_acesso(*next(proxima), fonte=indice), repeticoes * 10
+        )
+    return resultados
+
+
+# Acervo de planos: montar o registro de um plano (o custo no app) e o
+# resumo completo de um acervo sintético de n planos, lido do disco. O resumo
+# precisa do NumPy, que é opcional: sem ele, só o registro é medido.
+def bench_acervo(repeticoes, n, pasta, meta):
+    from ancora.acervo import ARQUIVO_PLANOS, Acervo
+
+    pasta_acervo = os.path.join(pasta, 'acervo')
+    acervo = Acervo(pasta_acervo)
+    dados, moedas = plano_exemplo(3)
+    resultados = {'acervo_registro_3_moedas': medir(lambda: acervo.registro(dados, moedas), repeticoes * 10)}
+
+    try:
+        import numpy as np
+    except ImportError:
+        meta['acervo_sem_numpy'] = True
+        return resultados
+    from ancora.analise import TIPO_REGISTRO, resumir_acervo
+
+    aleatorio = np.random.default_rng(42)
+    planos = np.zeros(n, dtype=TIPO_REGISTRO)
+    planos['data'] = 1_700_000_000 + aleatorio.integers(0, 30_000_000, n)
+    planos['profissao'] = aleatorio.integers(0, 200, n)
+    planos['preco_principal'] = aleatorio.uniform(100, 5000, n).round(2)
+    planos['preco_min'] = planos['preco_principal'] * aleatorio.uniform(0.05, 0.3, n)
+    planos['preco_max'] = planos['preco_min'] * aleatorio.uniform(1, 3, n)
+    planos['parc_min'] = aleatorio.integers(0, 4, n)
+    planos['parc_max'] = planos['parc_min'] + aleatorio.integers(0, 10, n)
+    planos['moedas'] = -1
+    planos['moedas'][:, :len(MOEDAS_EXEMPLO)] = aleatorio.integers(-1, len(PRIORIDADES), (n, len(MOEDAS_EXEMPLO)))
+    planos.tofile(os.path.join(pasta_acervo, ARQUIVO_PLANOS))
+    with open(os.path.join(pasta_acervo, 'profissoes.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"Profissão {i}\n" for i in range(200))
+    with open(os.path.join(pasta_acervo, 'moedas.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{nome}\n" for nome in MOEDAS_EXEMPLO)
+    resultados[f'acervo_resumo_{n}'] = medir(lambda: resumir_acervo(pasta_acervo), max(1, repeticoes // 10), aquecimento=0)
+    return resultados
+
+
+# Passo a passo completo (login + 4 etapas + imagem) pelo AppTest, imitando o
+# navegador: cada edição de widget fora de um st.form dispara um rerun (do app
+# inteiro, ou só do fragmento em `fragmento=True`); dentro de um formulário o
+# valor só é enviado junto com o botão. Devolve as contagens de reruns.
+def passo_a_passo(caminho_usuarios):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['ANCORA_USUARIOS_ARQUIVO'] = caminho_usuarios
+    dados, moedas = plano_exemplo(3)
+    reruns = {'app': 0, 'fragmento': 0}
+    at = AppTest.from_file(SCRIPT_APP, default_timeout=60)
+    _executar(at, reruns)
+    _editar(at, reruns, at.text_input(key='email_login'), 'cliente0@exemplo.com')
+    _editar(at, reruns, at.text_input(key='codigo_login'), 'ALN0000000')
+    _clicar(at, reruns, 'Acessar')
+
+    _editar(at, reruns, at.selectbox(key='profissao_select'), dados['profissao'])
+    _editar(at, reruns, at.text_input(key='oferta_input'), dados['oferta_principal'])
+    _editar(at, reruns, at.text_input(key='preco_input'), dados['preco_principal'])
+    _clicar(at, reruns, 'Avançar')
+
+    for chave, campo in (('ancora_input', 'nome_ancora'), ('preco_min_input', 'preco_min'),
+                         ('preco_max_input', 'preco_max'), ('parc_min_input', 'parc_min'),
+                         ('parc_max_input', 'parc_max')):
+        _editar(at, reruns, at.text_input(key=chave), dados[campo])
+    _clicar(at, reruns, 'Avançar')
+
+    for i, nome in enumerate(MOEDAS_EXEMPLO):
+        if nome in moedas:
+            _editar(at, reruns, at.checkbox(key=f'check_{i}'), True, fragmento=True)
+            _editar(at, reruns, at.text_area(key=f'desc_{i}'), moedas[nome]['descricao'], fragmento=True)
+    _clicar(at, reruns, 'Gerar Resultado')
+    _clicar(at, reruns, 'Gerar Imagem')
+    # A imagem completa sai da fila de render; o app confere por um fragmento
+    while at.session_state.render_pendente is not None:
+        time.sleep(0.02)
+        _executar(at, reruns, fragmento=True)
+    if at.exception or not at.session_state.imagem_gerada:
+        raise RuntimeError(f"passo a passo falhou: {at.exception}")
+    return reruns
+
+
+def _executar(at, reruns, fragmento=False):
+    at.run()
+    reruns['fragmento' if fragmento else 'app'] += 1
+
+
+def _editar(at, reruns, widget, valor, fragmento=False):
+    widget.set_value(valor)
+    if not widget.form_id:
+        _executar(at, reruns, fragmento)
+
+
+def _clicar(at, reruns, rotulo):
+    [b for b in at.button if rotulo in b.label][0].click()
+    _executar(at, reruns)
+
+
+# Primeira tela (login) num processo novo, como no primeiro acesso depois de
+# subir o app: tempo do primeiro run pelo AppTest e quanto dele foi
+# importação de módulos do app (fora o Streamlit), lida do -X importtime
+CODIGO_PARTIDA = '''
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+sys.stderr.write("@@primeira-tela@@\\n")
+sys.stderr.flush()
+inicio = time.perf_counter()
+at.run()
+print((time.perf_counter() - inicio) * 1000, int("PIL" in sys.modules))
+'''
+
+
+def partida_fria(script=SCRIPT_APP):
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CODIGO_PARTIDA, script],
+        cwd=os.path.dirname(script), capture_output=True, text=True, check=True
+    )
+    importacoes = processo.stderr.split('@@primeira-tela@@', 1)[1]
+    # Só os imports de primeiro nível (os aninhados já estão no acumulado)
+    importacao_us = sum(
+        int(acumulado) for acumulado, modulo in re.findall(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)', importacoes)
+        if not modulo.startswith('streamlit')
+    )
+    primeira_ms, pillow = processo.stdout.split()
+    return float(primeira_ms), importacao_us / 1000, pillow == '1'
+
+
+def bench_partida(repeticoes, meta):
+    medidas = [partida_fria() for _ in range(repeticoes)]
+    meta['partida'] = {
+        'importacao_app_ms': statistics.median(m[1] for m in medidas),
+        'pillow_na_primeira_tela': any(m[2] for m in medidas)
+    }
+    return {'primeira_tela_fria': [m[0] for m in medidas]}
+
+
+# As contagens de reruns por plano vão para `meta` (não são tempos)
+def bench_passo_a_passo(repeticoes, pasta, meta):
+    caminho = gerar_arquivo_usuarios(pasta, 10)
+    anterior = os.environ.get('ANCORA_USUARIOS_ARQUIVO')
+    try:
+        meta['reruns_por_plano'] = passo_a_passo(caminho)
+        return {'passo_a_passo_app': medir(lambda: passo_a_passo(caminho), repeticoes, aquecimento=0)}
+    finally:
+        if anterior is None:
+            os.environ.pop('ANCORA_USUARIOS_ARQUIVO', None)
+        else:
+            os.environ['ANCORA_USUARIOS_ARQUIVO'] = anterior
+
+
+def executar(repeticoes=20, tamanhos=TAMANHOS_USUARIOS, passo_a_passo_app=True, progresso=sys.stderr,
+             planos_acervo=PLANOS_ACERVO):
+    tempos = {}
+    meta = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'versao_render': VERSAO_RENDER,
+        'repeticoes': repeticoes
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        etapas = [('render', lambda: bench_render(repeticoes)),
+                  ('vetorial', lambda: bench_vetor(repeticoes, meta)),
+                  ('usuários', lambda: bench_usuarios(repeticoes, tamanhos, pasta)),
+                  ('acervo', lambda: bench_acervo(repeticoes, planos_acervo, pasta, meta))]
+        if passo_a_passo_app:
+            etapas.append(('primeira tela', lambda: bench_partida(max(3, repeticoes // 4), meta)))
+            etapas.append(('passo a passo', lambda: bench_passo_a_passo(max(1, repeticoes // 4), pasta, meta)))
+        for nome, etapa in etapas:
+            if progresso:
+                progresso.write(f"Medindo {nome}...\n")
+            tempos.update(etapa())
+    return {
+        'meta': meta,
+        'resultados': {nome: resumir(t) for nome, t in tempos.items()}
+    }
+
+
+# Compara as medianas de dois resultados. Retorna linhas
+# (nome, base_ms, atual_ms, variacao_%, regrediu)
+def comparar(base, atual, limite=10.0):
+    linhas = []
+    for nome, stats in atual['resultados'].items():
+        if nome not in base['resultados']:
+            continue
+        antes = base['resultados'][nome]['mediana_ms']
+        depois = stats['mediana_ms']
+        variacao = (depois - antes) / antes * 100 if antes else 0.0
+        linhas.append((nome, antes, depois, variacao, variacao > limite))
+    return linhas
+
+
+def imprimir_resultados(resultado, saida=sys.stdout):
+    saida.write(f"{'benchmark':<32}{'mediana':>12}{'p90':>12}{'p99':>12}{'n':>6}\n")
+    for nome, s in resultado['resultados'].items():
+        saida.write(f"{nome:<32}{s['mediana_ms']:>10.3f}ms{s['p90_ms']:>10.3f}ms{s['p99_ms']:>10.3f}ms{s['n']:>6}\n")
+    tamanhos = resultado['meta'].get('bytes_3_moedas')
+    if tamanhos:
+        saida.write("\nArquivo com 3 moedas: " + ', '.join(f"{f} {b / 1024:.1f} KB" for f, b in tamanhos.items()) + "\n")
+    partida = resultado['meta'].get('partida')
+    if partida:
+        saida.write(f"\nPrimeira tela: {partida['importacao_app_ms']:.1f} ms importando módulos do app, "
+                    f"Pillow {'carregado' if partida['pillow_na_primeira_tela'] else 'não carregado'}\n")
+    if resultado['meta'].get('acervo_sem_numpy'):
+        saida.write("\nResumo do acervo não medido: NumPy não instalado (pip install numpy)\n")
+    reruns = resultado['meta'].get('reruns_por_plano')
+    if reruns:
+        saida.write(f"\nReruns por plano: {reruns['app']} do app, {reruns['fragmento']} de fragmento\n")
+
+
+def imprimir_comparacao(linhas, limite, saida=sys.stdout):
+    saida.write(f"{'benchmark':<32}{'base':>12}{'atual':>12}{'variação':>10}\n")
+    for nome, antes, depois, variacao, regrediu in linhas:
+        marca = '  ⚠️ regressão' if regrediu else ''
+        saida.write(f"{nome:<32}{antes:>10.3f}ms{depois:>10.3f}ms{variacao:>+9.1f}%{marca}\n")
+    regressoes = sum(1 for linha in linhas if linha[4])
+    saida.write(f"\n{regressoes} regressões acima de {limite:.0f}%\n")
+    return regressoes
+
+
+def salvar(resultado, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+def carregar(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
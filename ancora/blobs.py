@@ -0,0 +1,130 @@
+# Armazém das imagens geradas, endereçado pelo conteúdo: cada arquivo é
+# gravado uma vez numa pasta temporária (nome = hash dos bytes) e a sessão
+# guarda só a chave. Planos iguais, em qualquer sessão, dividem o arquivo.
+#
+# Cada sessão que mostra um arquivo conta uma referência; quando a última
+# solta, ele é apagado. Sessões abandonadas nunca soltam: arquivos sem
+# acesso há mais de `validade` segundos saem mesmo com referências.
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+from ancora import metricas
+
+# Intervalo mínimo entre duas buscas por arquivos vencidos, em segundos
+INTERVALO_LIMPEZA = 60
+
+
+class ArmazemBlobs:
+    def __init__(self, pasta, validade):
+        self.pasta = pasta
+        self.validade = validade
+        # chave -> [referências, tamanho, último acesso]
+        self._blobs = {}
+        self._lock = threading.Lock()
+        self._ultima_limpeza = time.monotonic()
+        self.gravados = 0
+        self.reaproveitados = 0
+        self.expirados = 0
+
+    # Guarda o conteúdo (se ainda não existe) e devolve a chave, já com uma
+    # referência para quem chamou
+    def guardar(self, conteudo, extensao):
+        chave = f"{hashlib.sha256(conteudo).hexdigest()[:32]}.{extensao}"
+        with self._lock:
+            self._limpar_vencidos()
+            blob = self._blobs.get(chave)
+            if blob is None:
+                # Grava com o lock: ninguém recebe a chave antes do arquivo existir
+                fd, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(conteudo)
+                os.replace(temporario, os.path.join(self.pasta, chave))
+                blob = self._blobs[chave] = [0, len(conteudo), 0.0]
+                self.gravados += 1
+            else:
+                self.reaproveitados += 1
+            blob[0] += 1
+            blob[2] = time.monotonic()
+        return chave
+
+    # Caminho do arquivo, para o Streamlit ler direto do disco; None se a
+    # chave já foi apagada. Conta como acesso.
+    def caminho(self, chave):
+        with self._lock:
+            self._limpar_vencidos()
+            blob = self._blobs.get(chave)
+            if blob is None:
+                return None
+            blob[2] = time.monotonic()
+        return os.path.join(self.pasta, chave)
+
+    def ler(self, chave):
+        caminho = self.caminho(chave)
+        if caminho is None:
+            return None
+        try:
+            with open(caminho, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def tamanho(self, chave):
+        with self._lock:
+            blob = self._blobs.get(chave)
+            return blob[1] if blob else 0
+
+    def soltar(self, chave):
+        with self._lock:
+            blob = self._blobs.get(chave)
+            if blob is None:
+                return
+            blob[0] -= 1
+            if blob[0] <= 0:
+                self._apagar(chave)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'arquivos': len(self._blobs),
+                'bytes': sum(blob[1] for blob in self._blobs.values()),
+                'referencias': sum(blob[0] for blob in self._blobs.values()),
+                'gravados': self.gravados,
+                'reaproveitados': self.reaproveitados,
+                'expirados': self.expirados
+            }
+
+    # Chamar com o lock adquirido
+    def _apagar(self, chave):
+        del self._blobs[chave]
+        try:
+            os.remove(os.path.join(self.pasta, chave))
+        except FileNotFoundError:
+            pass
+
+    # Chamar com o lock adquirido. No máximo uma busca por INTERVALO_LIMPEZA.
+    def _limpar_vencidos(self):
+        agora = time.monotonic()
+        if agora - self._ultima_limpeza < INTERVALO_LIMPEZA:
+            return
+        self._ultima_limpeza = agora
+        for chave in [c for c, blob in self._blobs.items() if agora - blob[2] > self.validade]:
+            self._apagar(chave)
+            self.expirados += 1
+
+
+# Armazém único do processo, numa pasta própria apagada na saída:
+#   ANCORA_BLOBS_DIR            onde criar a pasta (padrão: temporário do sistema)
+#   ANCORA_BLOBS_VALIDADE_MIN   minutos sem acesso até apagar (padrão 60)
+@lru_cache(maxsize=1)
+def armazem_blobs():
+    pasta = tempfile.mkdtemp(prefix='ancora-blobs-', dir=os.environ.get('ANCORA_BLOBS_DIR') or None)
+    atexit.register(shutil.rmtree, pasta, ignore_errors=True)
+    armazem = ArmazemBlobs(pasta, float(os.environ.get('ANCORA_BLOBS_VALIDADE_MIN') or 60) * 60)
+    metricas.registrar_medidor('blobs', armazem.estatisticas)
+    return armazem
@@ -0,0 +1,156 @@
+# Cache das imagens já codificadas, endereçado pelo hash do plano.
+# Dois níveis: memória (LRU limitado em bytes, compartilhado entre sessões)
+# e, opcionalmente, uma pasta em disco com limite de tamanho.
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+
+class CacheImagens:
+    def __init__(self, limite_memoria, pasta=None, limite_disco=0):
+        self.limite_memoria = limite_memoria
+        self.pasta = pasta
+        self.limite_disco = limite_disco
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self._bytes_disco = 0
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+            self._bytes_disco = sum(tamanho for _, tamanho, _ in self._arquivos_disco())
+
+    # Busca a imagem; None se não estiver em nenhum dos níveis
+    def obter(self, chave):
+        with self._lock:
+            conteudo = self._memoria.get(chave)
+            if conteudo is not None:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return conteudo
+        conteudo = self._ler_disco(chave)
+        with self._lock:
+            if conteudo is None:
+                self.falhas += 1
+                return None
+            self.acertos_disco += 1
+            self._guardar_memoria(chave, conteudo)
+        return conteudo
+
+    def guardar(self, chave, conteudo):
+        with self._lock:
+            self._guardar_memoria(chave, conteudo)
+        self._gravar_disco(chave, conteudo)
+
+    def obter_ou_gerar(self, chave, gerar):
+        conteudo = self.obter(chave)
+        if conteudo is None:
+            conteudo = gerar()
+            self.guardar(chave, conteudo)
+        return conteudo
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos_memoria + self.acertos_disco + self.falhas
+            return {
+                'acertos_memoria': self.acertos_memoria,
+                'acertos_disco': self.acertos_disco,
+                'falhas': self.falhas,
+                'taxa_acerto': (consultas - self.falhas) / consultas if consultas else 0.0,
+                'itens_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+                'bytes_disco': self._bytes_disco
+            }
+
+    # Chamar com o lock adquirido
+    def _guardar_memoria(self, chave, conteudo):
+        if len(conteudo) > self.limite_memoria:
+            return
+        anterior = self._memoria.pop(chave, None)
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        self._memoria[chave] = conteudo
+        self._bytes_memoria += len(conteudo)
+        while self._bytes_memoria > self.limite_memoria:
+            _, removido = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(removido)
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave + '.img')
+
+    def _ler_disco(self, chave):
+        if not self.pasta:
+            return None
+        try:
+            with open(self._caminho(chave), 'rb') as f:
+                conteudo = f.read()
+        except FileNotFoundError:
+            return None
+        # Marca o uso para a remoção por idade (atime pode estar desligado)
+        try:
+            os.utime(self._caminho(chave))
+        except OSError:
+            pass
+        return conteudo
+
+    # Grava em arquivo temporário e renomeia, para outro processo nunca ler
+    # uma imagem pela metade
+    def _gravar_disco(self, chave, conteudo):
+        if not self.pasta or len(conteudo) > self.limite_disco:
+            return
+        caminho = self._caminho(chave)
+        if os.path.exists(caminho):
+            return
+        fd, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+        with self._lock:
+            self._bytes_disco += len(conteudo)
+            excedeu = self._bytes_disco > self.limite_disco
+        if excedeu:
+            self._limpar_disco()
+
+    def _arquivos_disco(self):
+        arquivos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.name.endswith('.img'):
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        return arquivos
+
+    # Remove os arquivos usados há mais tempo até ficar em 90% do limite
+    def _limpar_disco(self):
+        arquivos = sorted(self._arquivos_disco())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        alvo = self.limite_disco * 0.9
+        for _, tamanho, caminho in arquivos:
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+        with self._lock:
+            self._bytes_disco = total
+
+
+# Cache único do processo. Configuração por variáveis de ambiente:
+#   ANCORA_CACHE_MB        limite da memória (padrão 64 MB)
+#   ANCORA_CACHE_DIR       pasta do cache em disco (desligado se vazio)
+#   ANCORA_CACHE_DISCO_MB  limite da pasta (padrão 512 MB)
+@lru_cache(maxsize=1)
+def cache_imagens():
+    return CacheImagens(
+        limite_memoria=int(float(os.environ.get('ANCORA_CACHE_MB', '64')) * 1024 * 1024),
+        pasta=os.environ.get('ANCORA_CACHE_DIR') or None,
+        limite_disco=int(float(os.environ.get('ANCORA_CACHE_DISCO_MB', '512')) * 1024 * 1024)
+    )
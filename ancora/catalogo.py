@@ -0,0 +1,30 @@
+# Dados fixos do app (moedas de troca e textos de ajuda). Ficam em módulo
+# para serem montados uma vez por processo, não a cada rerun. As profissões
+# e os exemplos vêm de profissoes.json (ancora/profissoes.py).
+
+# Moedas de troca
+MOEDAS = [
+    'Bonificação',
+    'Garantia Estendida',
+    'Programa de Fidelidade',
+    'Parcelamento Facilitado',
+    'Entrega Rápida/Prioritária',
+    'Personalização',
+    'Recompensa por Indicação'
+]
+
+# Tooltips para cada campo
+TOOLTIPS = {
+    'profissao': 'Escolha sua área de atuação para receber exemplos personalizados',
+    'oferta_principal': 'Seu produto ou serviço PRINCIPAL que você quer vender. Este preço NÃO sofrerá desconto.',
+    'preco_principal': 'Preço cheio da sua oferta principal. Este valor permanecerá intacto na negociação.',
+    'ancora': 'Um produto/serviço adicional de BAIXO CUSTO para você, mas ALTO VALOR percebido pelo cliente. Esta será sua ferramenta de negociação.',
+    'preco_minimo': 'Quanto você PRECISA receber no mínimo para não ter prejuízo? Considere seus custos reais.',
+    'preco_maximo': 'Preço ideal da âncora. Pode ser até 30-40% do valor da oferta principal.',
+    'parcelamento': 'Quantas vezes você pode parcelar sem comprometer seu fluxo de caixa?',
+    'moedas': 'Concessões que você pode oferecer SEM dar desconto. Escolha 1 a 3 opções.',
+    'prioridade': 'Defina a ordem: qual concessão você oferece primeiro, segunda, terceira...'
+}
+
+# Nomes das etapas do passo a passo
+ETAPAS_NOMES = ['Identificação', 'Oferta Âncora', 'Moedas de Troca', 'Resultado']
@@ -0,0 +1,212 @@
+# Comandos de linha de comando (sem Streamlit)
+import argparse
+import json
+import os
+import sys
+
+
+def cmd_usuarios_importar(args):
+    from ancora.banco_usuarios import banco_usuarios
+
+    banco = banco_usuarios(args.banco)
+    with open(args.arquivo, 'r', encoding='utf-8') as f:
+        importadas, ignoradas, removidas = banco.importar(f, lote=args.lote, sincronizar=args.sincronizar)
+    print(f"✅ {importadas} usuários importados, {ignoradas} linhas ignoradas, {removidas} removidos")
+    print(f"Total no banco: {banco.total()}")
+    return 0
+
+
+def cmd_usuarios_renovar(args):
+    from ancora.banco_usuarios import banco_usuarios
+
+    try:
+        renovado = banco_usuarios(args.banco).renovar(args.email, args.expiracao)
+    except FileNotFoundError:
+        print(f"⚠️ Banco de usuários não encontrado: {args.banco}")
+        return 1
+    except ValueError:
+        print("⚠️ Data inválida, use o formato AAAA-MM-DD")
+        return 2
+    if renovado:
+        print(f"✅ Acesso de {args.email} renovado até {args.expiracao}")
+        return 0
+    print(f"⚠️ Usuário {args.email} não encontrado")
+    return 1
+
+
+def cmd_acervo_resumo(args):
+    from ancora.analise import imprimir_resumo, resumir_acervo
+
+    if not os.path.isdir(args.pasta):
+        print(f"⚠️ Pasta do acervo não encontrada: {args.pasta}")
+        return 1
+    resumo = resumir_acervo(args.pasta, args.top)
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    else:
+        imprimir_resumo(resumo, args.top)
+    return 0
+
+
+def _desde(data):
+    from datetime import datetime
+
+    return datetime.strptime(data, '%Y-%m-%d').timestamp() if data else None
+
+
+def cmd_auditoria_resumo(args):
+    from ancora.auditoria import arquivos_log, imprimir_resumo, ler_eventos, resumir_eventos
+
+    if not arquivos_log(args.arquivo):
+        print(f"⚠️ Log de auditoria não encontrado: {args.arquivo}")
+        return 1
+    try:
+        desde = _desde(args.desde)
+    except ValueError:
+        print("⚠️ Data inválida, use o formato AAAA-MM-DD")
+        return 2
+    resumo = resumir_eventos(ler_eventos(args.arquivo, desde, args.tipo, args.email), args.top)
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    else:
+        imprimir_resumo(resumo)
+    return 0
+
+
+def cmd_auditoria_listar(args):
+    from ancora.auditoria import arquivos_log, ler_eventos
+
+    if not arquivos_log(args.arquivo):
+        print(f"⚠️ Log de auditoria não encontrado: {args.arquivo}")
+        return 1
+    try:
+        desde = _desde(args.desde)
+    except ValueError:
+        print("⚠️ Data inválida, use o formato AAAA-MM-DD")
+        return 2
+    try:
+        for evento in ler_eventos(args.arquivo, desde, args.tipo, args.email):
+            print(json.dumps(evento, ensure_ascii=False))
+    except BrokenPipeError:
+        # Saída cortada (ex.: `| head`): para sem erro
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+def cmd_render(args):
+    from ancora.lote import renderizar_arquivo
+
+    tamanho_max = args.tamanho_max * 1024 if args.tamanho_max else None
+    erros = renderizar_arquivo(args.entrada, args.saida, processos=args.processos,
+                               formato=args.formato, tamanho_max=tamanho_max)
+    if erros:
+        print(f"⚠️ {len(erros)} planos com erro:")
+        for numero_linha, arquivo, mensagem in erros:
+            print(f"  linha {numero_linha} ({arquivo or '-'}): {mensagem}")
+        return 1
+    print(f"✅ Imagens salvas em {args.saida}")
+    return 0
+
+
+def cmd_servir(args):
+    from ancora.servico import servir
+
+    servir(args.host, args.porta, args.trabalhadores, args.fila)
+    return 0
+
+
+def cmd_bench(args):
+    from ancora import benchmark
+
+    if args.entrada:
+        resultado = benchmark.carregar(args.entrada)
+    else:
+        tamanhos = [n for n in benchmark.TAMANHOS_USUARIOS if not (args.rapido and n >= 1_000_000)]
+        resultado = benchmark.executar(args.repeticoes, tamanhos, passo_a_passo_app=not args.sem_app,
+                                       planos_acervo=benchmark.PLANOS_ACERVO // 10 if args.rapido else benchmark.PLANOS_ACERVO)
+        benchmark.salvar(resultado, args.saida)
+        benchmark.imprimir_resultados(resultado)
+        print(f"\nResultados salvos em {args.saida}")
+    if args.comparar:
+        linhas = benchmark.comparar(benchmark.carregar(args.comparar), resultado, args.limite)
+        print()
+        if benchmark.imprimir_comparacao(linhas, args.limite):
+            return 1
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='python -m metodo_ancora', description='Ferramentas do Método Âncora de Valor')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    usuarios = comandos.add_parser('usuarios', help='Gerenciar a base de usuários em SQLite')
+    acoes = usuarios.add_subparsers(dest='acao', required=True)
+    banco_padrao = os.environ.get('ANCORA_USUARIOS_DB', 'usuarios.db')
+
+    importar = acoes.add_parser('importar', help='Importar um usuarios.txt para o banco')
+    importar.add_argument('arquivo', help='Arquivo no formato email,codigo,AAAA-MM-DD')
+    importar.add_argument('--banco', default=banco_padrao, help='Caminho do banco SQLite')
+    importar.add_argument('--lote', type=int, default=5000, help='Linhas por transação')
+    importar.add_argument('--sincronizar', action='store_true', help='Remover do banco quem não está no arquivo')
+    importar.set_defaults(func=cmd_usuarios_importar)
+
+    renovar = acoes.add_parser('renovar', help='Alterar a data de expiração de um usuário')
+    renovar.add_argument('email')
+    renovar.add_argument('expiracao', help='Nova data (AAAA-MM-DD)')
+    renovar.add_argument('--banco', default=banco_padrao, help='Caminho do banco SQLite')
+    renovar.set_defaults(func=cmd_usuarios_renovar)
+
+    acervo = comandos.add_parser('acervo', help='Analisar o acervo de planos concluídos')
+    acoes_acervo = acervo.add_subparsers(dest='acao', required=True)
+    resumo = acoes_acervo.add_parser('resumo', help='Âncora por profissão, uso das moedas e parcelamento')
+    resumo.add_argument('--pasta', default=os.environ.get('ANCORA_ACERVO', 'acervo'), help='Pasta do acervo')
+    resumo.add_argument('--top', type=int, default=10, help='Linhas por tabela')
+    resumo.add_argument('--json', action='store_true', help='Saída em JSON')
+    resumo.set_defaults(func=cmd_acervo_resumo)
+
+    auditoria = comandos.add_parser('auditoria', help='Ler o log de auditoria (logins e uso)')
+    acoes_auditoria = auditoria.add_subparsers(dest='acao', required=True)
+    arquivo_auditoria = os.environ.get('ANCORA_AUDITORIA', 'auditoria.jsonl')
+    for acao, funcao, ajuda in (('resumo', cmd_auditoria_resumo, 'Totais, rajadas de login negado e uso por cliente'),
+                                ('listar', cmd_auditoria_listar, 'Eventos filtrados, um JSON por linha')):
+        comando = acoes_auditoria.add_parser(acao, help=ajuda)
+        comando.add_argument('--arquivo', default=arquivo_auditoria, help='Log (os girados .1, .2... são lidos junto)')
+        comando.add_argument('--desde', help='Só eventos a partir desta data (AAAA-MM-DD)')
+        comando.add_argument('--tipo', help='Só eventos deste tipo (login, plano, imagem, descarte)')
+        comando.add_argument('--email', help='Só eventos deste email')
+        comando.set_defaults(func=funcao)
+        if acao == 'resumo':
+            comando.add_argument('--top', type=int, default=10, help='Linhas por tabela')
+            comando.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    render = comandos.add_parser('render', help='Gerar as imagens de um arquivo JSONL de planos')
+    render.add_argument('entrada', help='Arquivo JSONL, um plano por linha')
+    render.add_argument('saida', help='Pasta onde salvar as imagens')
+    render.add_argument('--formato', choices=['jpeg', 'webp', 'png'], default='jpeg', help='Formato das imagens')
+    render.add_argument('--tamanho-max', type=int, default=None, help='Tamanho máximo de cada arquivo, em KB')
+    render.add_argument('--processos', type=int, default=None, help='Número de processos (padrão: núcleos disponíveis)')
+    render.set_defaults(func=cmd_render)
+
+    servico = comandos.add_parser('servir', help='Serviço HTTP que gera a imagem de um plano em JSON')
+    servico.add_argument('--host', default='127.0.0.1')
+    servico.add_argument('--porta', type=int, default=8600)
+    servico.add_argument('--trabalhadores', type=int, default=None, help='Gerações simultâneas (padrão: núcleos disponíveis)')
+    servico.add_argument('--fila', type=int, default=None, help='Pedidos em espera antes de responder 429 (padrão: 4 por trabalhador)')
+    servico.set_defaults(func=cmd_servir)
+
+    bench = comandos.add_parser('bench', help='Medir geração, codificação, login e o app completo')
+    bench.add_argument('--saida', default='bench.json', help='Arquivo JSON com os resultados')
+    bench.add_argument('--repeticoes', type=int, default=20)
+    bench.add_argument('--rapido', action='store_true', help='Pular o arquivo de 1 milhão de usuários e usar um acervo menor')
+    bench.add_argument('--sem-app', action='store_true', help='Pular o passo a passo pelo AppTest')
+    bench.add_argument('--comparar', metavar='BASE', help='Comparar com um resultado anterior')
+    bench.add_argument('--entrada', metavar='ATUAL', help='Comparar este resultado salvo em vez de medir de novo')
+    bench.add_argument('--limite', type=float, default=10.0, help='Variação da mediana (%%) considerada regressão')
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,62 @@
+# CSS customizado do app
+CSS = """
+<style>
+    .main-header {
+        text-align: center;
+        padding: 2rem 0;
+    }
+    .main-title {
+        font-size: 3rem;
+        font-weight: bold;
+        color: #1F2937;
+        margin-bottom: 0.5rem;
+    }
+    .subtitle {
+        font-size: 1.2rem;
+        color: #6B7280;
+    }
+    .step-indicator {
+        background: linear-gradient(135deg, #4F46E5 0%, #7C3AED 100%);
+        color: white;
+        padding: 1rem;
+        border-radius: 10px;
+        text-align: center;
+        margin: 2rem 0;
+        font-weight: bold;
+    }
+    .success-box {
+        background: #ECFDF5;
+        border: 2px solid #A7F3D0;
+        border-radius: 10px;
+        padding: 1.5rem;
+        text-align: center;
+        margin: 1rem 0;
+    }
+    .tooltip-box {
+        background: #EFF6FF;
+        border-left: 4px solid #3B82F6;
+        padding: 0.8rem;
+        margin: 0.5rem 0 1rem 0;
+        border-radius: 5px;
+        font-size: 0.9rem;
+        color: #1E40AF;
+    }
+    .exemplo-box {
+        background: #F0FDF4;
+        border-left: 4px solid #10B981;
+        padding: 0.8rem;
+        margin: 0.5rem 0 1rem 0;
+        border-radius: 5px;
+        font-size: 0.85rem;
+        color: #065F46;
+    }
+    .login-box {
+        max-width: 450px;
+        margin: 3rem auto;
+        padding: 2rem;
+        background: white;
+        border-radius: 15px;
+        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+    }
+</style>
+"""
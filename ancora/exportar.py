@@ -0,0 +1,79 @@
+# Exportação da imagem do plano em JPEG, WebP ou PNG com paleta
+import io
+import time
+
+# Formatos oferecidos no download
+FORMATOS = {
+    'jpeg': {'rotulo': 'JPEG', 'extensao': 'jpg', 'mime': 'image/jpeg', 'qualidade': 95},
+    'webp': {'rotulo': 'WebP', 'extensao': 'webp', 'mime': 'image/webp', 'qualidade': 90},
+    'png': {'rotulo': 'PNG', 'extensao': 'png', 'mime': 'image/png', 'qualidade': 256},
+}
+
+# Limites da busca por tamanho: faixa de qualidade (JPEG/WebP) ou de cores
+# da paleta (PNG), e número máximo de codificações por busca
+FAIXA_QUALIDADE = {'jpeg': (30, 95), 'webp': (30, 95), 'png': (16, 256)}
+MAX_TENTATIVAS = 6
+
+
+# Codifica a imagem. Para JPEG e WebP `qualidade` é a qualidade (1-100);
+# para PNG é o número de cores da paleta.
+def codificar(img, formato='jpeg', qualidade=None):
+    if formato not in FORMATOS:
+        raise ValueError(f"formato desconhecido: {formato}")
+    if qualidade is None:
+        qualidade = FORMATOS[formato]['qualidade']
+    buf = io.BytesIO()
+    if formato == 'jpeg':
+        img.save(buf, format='JPEG', quality=qualidade, progressive=True, optimize=True)
+    elif formato == 'webp':
+        img.save(buf, format='WEBP', quality=qualidade, method=4)
+    else:
+        from PIL import Image
+
+        # Imagem de cores chapadas: a paleta reduz muito o arquivo
+        paleta = img.quantize(colors=qualidade, method=Image.Quantize.FASTOCTREE)
+        paleta.save(buf, format='PNG', compress_level=6)
+    return buf.getvalue()
+
+
+# Busca binária da maior qualidade que cabe em `tamanho_max` bytes, com no
+# máximo MAX_TENTATIVAS codificações. Se nem a menor qualidade couber,
+# devolve a menor versão obtida.
+def codificar_tamanho_alvo(img, formato, tamanho_max, tentativas=MAX_TENTATIVAS):
+    baixo, alto = FAIXA_QUALIDADE[formato]
+    padrao = FORMATOS[formato]['qualidade']
+    melhor = None
+    menor = None
+
+    # A qualidade padrão costuma caber: testa ela primeiro
+    candidatos = [padrao]
+    while tentativas > 0:
+        qualidade = candidatos.pop() if candidatos else (baixo + alto) // 2
+        conteudo = codificar(img, formato, qualidade)
+        tentativas -= 1
+        if menor is None or len(conteudo) < len(menor):
+            menor = conteudo
+        if len(conteudo) <= tamanho_max:
+            melhor = conteudo
+            if qualidade >= alto:
+                break
+            baixo = qualidade + 1
+        else:
+            alto = qualidade - 1
+        if baixo > alto:
+            break
+    return melhor if melhor is not None else menor
+
+
+# Codifica em todos os formatos e mede tamanho e tempo de cada um
+def comparar_formatos(img):
+    resultado = []
+    for formato, info in FORMATOS.items():
+        inicio = time.perf_counter()
+        conteudo = codificar(img, formato)
+        resultado.append({
+            'formato': info['rotulo'],
+            'bytes': len(conteudo),
+            'ms': (time.perf_counter() - inicio) * 1000
+        })
+    return resultado
@@ -0,0 +1,251 @@
+# Filas de render: trabalhadores limitados com fila limitada. O serviço HTTP
+# usa threads; o app usa processos compartilhados por todas as sessões.
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+
+from ancora import metricas
+from ancora.lote import numero_processos
+
+
+class FilaCheia(Exception):
+    pass
+
+
+# Trabalhadores limitados com fila limitada: quando trabalhadores + fila
+# estão ocupados, novos pedidos são recusados na hora em vez de esperar
+class FilaRender:
+    def __init__(self, trabalhadores, tamanho_fila):
+        self.trabalhadores = trabalhadores
+        self.tamanho_fila = tamanho_fila
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='render')
+        self._vagas = threading.BoundedSemaphore(trabalhadores + tamanho_fila)
+        self._lock = threading.Lock()
+        self.em_andamento = 0
+        self.recusados = 0
+
+    def submeter(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.recusados += 1
+            raise FilaCheia()
+        with self._lock:
+            self.em_andamento += 1
+        futuro = self._executor.submit(funcao, *args)
+        futuro.add_done_callback(self._liberar)
+        return futuro
+
+    def _liberar(self, futuro):
+        with self._lock:
+            self.em_andamento -= 1
+        self._vagas.release()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'trabalhadores': self.trabalhadores,
+                'tamanho_fila': self.tamanho_fila,
+                'em_andamento': self.em_andamento,
+                'recusados': self.recusados
+            }
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+
+
+class _Trabalho:
+    __slots__ = ('funcao', 'args', 'futuro', 'entrada', 'afinidade', 'ao_concluir')
+
+    def __init__(self, funcao, args, afinidade, ao_concluir):
+        self.funcao = funcao
+        self.args = args
+        self.futuro = Future()
+        self.entrada = time.monotonic()
+        self.afinidade = afinidade
+        self.ao_concluir = ao_concluir
+
+
+# Processos novos a partir de um servidor limpo (forkserver), nunca por fork
+# do processo do Streamlit, que tem threads. O servidor já carrega o desenho
+# (fontes, Pillow), então cada processo novo começa pronto.
+def _contexto_processos():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload(['ancora.imagem'])
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+# Os processos herdam o ambiente do app, mas só o app grava o arquivo de
+# métricas: os tempos medidos nos processos voltam junto com cada resultado
+def _preparar_processo():
+    os.environ.pop('ANCORA_METRICAS_ARQUIVO', None)
+
+
+def _novo_processo():
+    return ProcessPoolExecutor(max_workers=1, mp_context=_contexto_processos(), initializer=_preparar_processo)
+
+
+# Fila de processos em ordem de chegada: no máximo `processos` renders ao
+# mesmo tempo e `tamanho_fila` esperando (sem contar os cancelados); além
+# disso, FilaCheia. A fila fica
+# aqui (e não dentro do ProcessPoolExecutor) para saber a posição de cada
+# pedido e para que pedidos cancelados nem cheguem aos processos.
+#
+# Cada processo guarda os seus blocos de seção (imagem.bloco_secao). Para que
+# editar um campo e gerar de novo redesenhe só a seção alterada, os pedidos
+# da mesma `afinidade` (a sessão) vão sempre para o mesmo processo quando ele
+# está livre; se estiver ocupado, vai para outro livre, sem furar a fila.
+#
+# Um render que passa de `tempo_limite` segundos falha com TimeoutError para
+# quem espera; o processo só fica livre quando ele termina de fato. O
+# resultado que chega depois ainda vai para `ao_concluir` (ex.: o cache).
+class FilaProcessos:
+    def __init__(self, processos, tamanho_fila, tempo_limite=None):
+        self.processos = processos
+        self.tamanho_fila = tamanho_fila
+        self.tempo_limite = tempo_limite
+        # Um executor de um processo por trabalhador, para escolher qual atende
+        self._executores = [_novo_processo() for _ in range(processos)]
+        self._livres = set(range(processos))
+        self._espera = deque()
+        # Reentrante: um callback de tarefa já concluída roda dentro do submit
+        self._lock = threading.RLock()
+        self.concluidos = 0
+        self.recusados = 0
+        self.expirados = 0
+        self.no_mesmo_processo = 0
+
+    @property
+    def em_execucao(self):
+        return self.processos - len(self._livres)
+
+    # `ao_concluir(resultado)` roda quando o render dá certo, mesmo que quem
+    # esperava já tenha desistido (cancelado ou expirado)
+    def submeter(self, funcao, *args, afinidade=None, ao_concluir=None):
+        trabalho = _Trabalho(funcao, args, afinidade, ao_concluir)
+        with self._lock:
+            # Como na FilaRender, o limite é processos + fila: com processo
+            # livre o pedido entra direto, e cancelados não ocupam vaga
+            if not self._livres and len(self._espera) >= self.tamanho_fila:
+                self._espera = deque(t for t in self._espera if not t.futuro.cancelled())
+                if len(self._espera) >= self.tamanho_fila:
+                    self.recusados += 1
+                    raise FilaCheia()
+            self._espera.append(trabalho)
+            self._despachar()
+        return trabalho.futuro
+
+    # Posição do pedido na fila (1 = o próximo); 0 se já está em execução ou terminou
+    def posicao(self, futuro):
+        with self._lock:
+            for i, trabalho in enumerate(self._espera, 1):
+                if trabalho.futuro is futuro:
+                    return i
+        return 0
+
+    def _processo_preferido(self, afinidade):
+        return zlib.crc32(str(afinidade).encode('utf-8')) % self.processos
+
+    # Chamado com o lock: envia aos processos livres, na ordem de chegada
+    def _despachar(self):
+        while self._espera and self._livres:
+            trabalho = self._espera.popleft()
+            if not trabalho.futuro.set_running_or_notify_cancel():
+                continue
+            metricas.observar('espera_fila', (time.monotonic() - trabalho.entrada) * 1000)
+            indice = None
+            if trabalho.afinidade is not None:
+                indice = self._processo_preferido(trabalho.afinidade)
+                if indice in self._livres:
+                    self.no_mesmo_processo += 1
+                else:
+                    indice = None
+            if indice is None:
+                indice = min(self._livres)
+            tarefa = (metricas.executar_medindo, trabalho.funcao, *trabalho.args)
+            try:
+                interno = self._executores[indice].submit(*tarefa)
+            except BrokenProcessPool:
+                # O processo morreu (ex.: falta de memória): recria só ele
+                self._executores[indice] = _novo_processo()
+                interno = self._executores[indice].submit(*tarefa)
+            except RuntimeError as e:
+                # Pool encerrado (o processo está saindo): não há quem desenhe
+                trabalho.futuro.set_exception(e)
+                continue
+            self._livres.discard(indice)
+            interno.add_done_callback(partial(self._terminar, trabalho, indice))
+            if self.tempo_limite:
+                relogio = threading.Timer(self.tempo_limite, self._expirar, (trabalho,))
+                relogio.daemon = True
+                relogio.start()
+
+    def _terminar(self, trabalho, indice, interno):
+        with self._lock:
+            self._livres.add(indice)
+            self.concluidos += 1
+            self._despachar()
+        erro = interno.exception()
+        if erro is None:
+            resultado, observacoes = interno.result()
+            metricas.registrar_observacoes(observacoes)
+            if trabalho.ao_concluir is not None:
+                try:
+                    trabalho.ao_concluir(resultado)
+                except Exception:
+                    # Guardar o resultado é um extra; quem espera recebe do mesmo jeito
+                    pass
+        try:
+            if erro is None:
+                trabalho.futuro.set_result(resultado)
+            else:
+                trabalho.futuro.set_exception(erro)
+        except InvalidStateError:
+            # Já expirou
+            pass
+
+    def _expirar(self, trabalho):
+        try:
+            trabalho.futuro.set_exception(TimeoutError(f"render passou de {self.tempo_limite:g} s"))
+        except InvalidStateError:
+            return
+        with self._lock:
+            self.expirados += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'processos': self.processos,
+                'tamanho_fila': self.tamanho_fila,
+                'na_fila': len(self._espera),
+                'em_execucao': self.em_execucao,
+                'concluidos': self.concluidos,
+                'recusados': self.recusados,
+                'expirados': self.expirados,
+                'no_mesmo_processo': self.no_mesmo_processo
+            }
+
+    def encerrar(self):
+        for executor in self._executores:
+            executor.shutdown(wait=True)
+
+
+# Fila única do processo para o app (todas as sessões do Streamlit). Configurável:
+#   ANCORA_RENDER_TRABALHADORES  processos de render (padrão: núcleos)
+#   ANCORA_RENDER_FILA           pedidos esperando (padrão: 4 por processo)
+#   ANCORA_RENDER_TEMPO_LIMITE   segundos por render (padrão: 60)
+@lru_cache(maxsize=1)
+def fila_render():
+    processos = int(os.environ.get('ANCORA_RENDER_TRABALHADORES') or numero_processos())
+    tamanho_fila = int(os.environ.get('ANCORA_RENDER_FILA') or processos * 4)
+    tempo_limite = float(os.environ.get('ANCORA_RENDER_TEMPO_LIMITE') or 60)
+    fila = FilaProcessos(processos, tamanho_fila, tempo_limite)
+    metricas.registrar_medidor('fila', fila.estatisticas)
+    return fila
@@ -0,0 +1,135 @@
+# Registro de fontes compartilhado pelo processo inteiro
+import os
+import struct
+from functools import lru_cache
+
+from PIL import ImageFont
+
+# Pastas onde procurar as fontes, na ordem de preferência
+PASTAS_FONTES = [
+    '/usr/share/fonts/truetype/dejavu',
+    '/usr/share/fonts/dejavu',
+    '/usr/share/fonts/TTF',
+    '/usr/share/fonts/truetype/noto',
+    '/usr/share/fonts/noto',
+    '/usr/share/fonts/truetype/ancient-scripts',
+    '/usr/local/share/fonts',
+    '/Library/Fonts',
+    os.path.expanduser('~/.fonts'),
+]
+
+# Nome do arquivo de cada peso, por família. As fontes de símbolos e emoji
+# (reservas para o que a DejaVu não desenha) só têm o peso regular.
+ARQUIVOS_FONTES = {
+    'DejaVuSans': {
+        'regular': 'DejaVuSans.ttf',
+        'bold': 'DejaVuSans-Bold.ttf',
+    },
+    'NotoSansSymbols2': {'regular': 'NotoSansSymbols2-Regular.ttf'},
+    'NotoEmoji': {'regular': 'NotoEmoji-Regular.ttf'},
+    'Symbola': {'regular': 'Symbola_hint.ttf'},
+}
+
+
+# Localiza o arquivo da fonte uma única vez; None se não estiver instalada.
+# Sem o peso pedido, usa o regular da família.
+@lru_cache(maxsize=None)
+def caminho_fonte(familia, peso):
+    arquivos = ARQUIVOS_FONTES.get(familia, {})
+    arquivo = arquivos.get(peso) or arquivos.get('regular')
+    if not arquivo:
+        return None
+    for pasta in PASTAS_FONTES:
+        caminho = os.path.join(pasta, arquivo)
+        if os.path.isfile(caminho):
+            return caminho
+    return None
+
+
+# Fonte padrão do Pillow, carregada uma vez só
+@lru_cache(maxsize=1)
+def fonte_padrao():
+    return ImageFont.load_default()
+
+
+# Retorna a fonte já carregada para (família, peso, tamanho)
+@lru_cache(maxsize=128)
+def fonte(familia, peso, tamanho):
+    caminho = caminho_fonte(familia, peso)
+    if caminho is None:
+        return fonte_padrao()
+    try:
+        return ImageFont.truetype(caminho, tamanho)
+    except OSError:
+        return fonte_padrao()
+
+
+# Codepoints que a fonte desenha, lidos da tabela cmap do arquivo (formatos
+# 4 e 12). Lido uma vez por arquivo no processo; vazio se não instalada.
+@lru_cache(maxsize=None)
+def cobertura(familia, peso):
+    caminho = caminho_fonte(familia, peso)
+    if caminho is None:
+        return frozenset()
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    try:
+        return frozenset(_ler_cmap(dados))
+    except struct.error:
+        # Arquivo que não sabemos ler: trata como sem cobertura
+        return frozenset()
+
+
+def _ler_cmap(dados):
+    num_tabelas = struct.unpack_from('>H', dados, 4)[0]
+    for i in range(num_tabelas):
+        tag, _, inicio, _ = struct.unpack_from('>4sIII', dados, 12 + 16 * i)
+        if tag == b'cmap':
+            break
+    else:
+        return set()
+    # Subtabelas Unicode (plataforma 0, ou 3 com codificação 1/10) por formato
+    subtabelas = {}
+    for i in range(struct.unpack_from('>H', dados, inicio + 2)[0]):
+        plataforma, codificacao, deslocamento = struct.unpack_from('>HHI', dados, inicio + 4 + 8 * i)
+        if plataforma == 0 or (plataforma == 3 and codificacao in (1, 10)):
+            posicao = inicio + deslocamento
+            subtabelas.setdefault(struct.unpack_from('>H', dados, posicao)[0], posicao)
+
+    codepoints = set()
+    if 12 in subtabelas:
+        posicao = subtabelas[12]
+        for g in range(struct.unpack_from('>I', dados, posicao + 12)[0]):
+            primeiro, ultimo, _ = struct.unpack_from('>III', dados, posicao + 16 + 12 * g)
+            codepoints.update(range(primeiro, ultimo + 1))
+    elif 4 in subtabelas:
+        posicao = subtabelas[4]
+        segmentos = struct.unpack_from('>H', dados, posicao + 6)[0] // 2
+        finais = struct.unpack_from(f'>{segmentos}H', dados, posicao + 14)
+        iniciais = struct.unpack_from(f'>{segmentos}H', dados, posicao + 16 + 2 * segmentos)
+        deltas = struct.unpack_from(f'>{segmentos}h', dados, posicao + 16 + 4 * segmentos)
+        pos_deslocamentos = posicao + 16 + 6 * segmentos
+        deslocamentos = struct.unpack_from(f'>{segmentos}H', dados, pos_deslocamentos)
+        for s, (primeiro, ultimo, delta, deslocamento) in enumerate(zip(iniciais, finais, deltas, deslocamentos)):
+            for c in range(primeiro, ultimo + 1):
+                if c == 0xFFFF:
+                    continue
+                if deslocamento == 0:
+                    glifo = (c + delta) & 0xFFFF
+                else:
+                    endereco = pos_deslocamentos + 2 * s + deslocamento + 2 * (c - primeiro)
+                    glifo = struct.unpack_from('>H', dados, endereco)[0]
+                    if glifo:
+                        glifo = (glifo + delta) & 0xFFFF
+                if glifo:
+                    codepoints.add(c)
+    return codepoints
+
+
+# Atalhos para a família usada nas imagens
+def fonte_regular(tamanho):
+    return fonte('DejaVuSans', 'regular', tamanho)
+
+
+def fonte_negrito(tamanho):
+    return fonte('DejaVuSans', 'bold', tamanho)
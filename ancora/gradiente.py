@@ -0,0 +1,40 @@
+# Fundo em gradiente das imagens geradas
+from functools import lru_cache
+
+from PIL import Image
+
+# Cores do gradiente horizontal usado no plano (esquerda -> direita)
+CORES_FUNDO = ((235, 244, 255), (224, 231, 255))
+
+
+# Calcula a cor da coluna x, interpolando entre as paradas de cor
+def _cor_coluna(x, width, cores):
+    t = (x / width) * (len(cores) - 1)
+    segmento = min(int(t), len(cores) - 2)
+    local = t - segmento
+    inicio, fim = cores[segmento], cores[segmento + 1]
+    return tuple(int(a + (b - a) * local) for a, b in zip(inicio, fim))
+
+
+# Monta o gradiente uma única vez por (largura, altura, cores): gera só uma
+# linha de 1px e estica na vertical, em vez de pintar pixel a pixel
+@lru_cache(maxsize=4)
+def _gradiente_base(width, height, cores):
+    faixa = Image.new('RGB', (width, 1))
+    faixa.putdata([_cor_coluna(x, width, cores) for x in range(width)])
+    return faixa.resize((width, height), Image.NEAREST)
+
+
+# Altura dos blocos em que o gradiente é guardado: cada linha do gradiente é
+# igual, então uma base mais alta recortada na altura pedida dá o mesmo
+# resultado e poucas bases atendem todas as alturas de imagem
+ALTURA_BLOCO = 512
+
+
+# Retorna uma cópia do gradiente pronta para desenhar por cima
+def fundo_gradiente(width, height, cores=CORES_FUNDO):
+    altura_base = -(-height // ALTURA_BLOCO) * ALTURA_BLOCO
+    base = _gradiente_base(width, altura_base, tuple(map(tuple, cores)))
+    if altura_base == height:
+        return base.copy()
+    return base.crop((0, 0, width, height))
@@ -0,0 +1,153 @@
+# Geração da imagem do plano de negociação (independente do Streamlit)
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from ancora.cache_imagens import cache_imagens
+from ancora.exportar import codificar, codificar_tamanho_alvo, comparar_formatos
+from ancora.gradiente import fundo_gradiente
+from ancora.layout import escalar_elemento, medir_layout
+from ancora.metricas import medir
+from ancora.plano import chave_plano
+from ancora.texto import desenhar_texto
+
+# Versão do desenho: mude sempre que o layout da imagem mudar, para que
+# imagens antigas guardadas em cache não sejam reaproveitadas
+VERSAO_RENDER = 4
+
+# Camadas fixas guardadas por processo (cada variante de layout tem a sua)
+MAX_SPRITES = 32
+# Seções já desenhadas guardadas por processo (~1 MB cada)
+MAX_BLOCOS = 48
+
+# A prévia tem 1/FATOR_PREVIA da largura e qualidade baixa
+FATOR_PREVIA = 3
+QUALIDADE_PREVIA = 70
+
+
+# Desenha os elementos de uma seção deslocados em dy
+def desenhar_elementos(draw, elementos, dy=0):
+    for elemento in elementos:
+        tipo = elemento[0]
+        if tipo == 'texto':
+            _, (x, y), texto, spec, cor = elemento
+            desenhar_texto(draw, (x, y + dy), texto, spec, cor)
+        elif tipo == 'retangulo':
+            _, (x0, y0, x1, y1), cor, raio = elemento
+            draw.rounded_rectangle([(x0, y0 + dy), (x1, y1 + dy)], radius=raio, fill=cor)
+        elif tipo == 'linha':
+            _, (x0, y0, x1, y1), cor, largura = elemento
+            draw.line([(x0, y0 + dy), (x1, y1 + dy)], fill=cor, width=largura)
+
+
+# Desenha o layout inteiro em outra escala, direto dos elementos (sem os
+# blocos de 1080 px), com o canto em (dx, dy)
+def desenhar_escalado(img, layout, escala, dx=0, dy=0):
+    draw = ImageDraw.Draw(img)
+    for secao in layout.secoes:
+        y = dy + round(secao.y * escala)
+        desenhar_elementos(draw, [escalar_elemento(e, escala, dx, y) for e in secao.fixos + secao.elementos])
+
+
+# Camada fixa de uma seção (caixas, rótulos, roteiro) desenhada uma vez em
+# RGBA transparente e recortada na área ocupada. A chave são os próprios
+# elementos, então mais linhas ou mais moedas geram um sprite novo.
+# Devolve (sprite, (x, y)) ou None se não houver nada visível.
+@lru_cache(maxsize=MAX_SPRITES)
+def sprite_fixo(largura, altura, fixos):
+    # +1: o Pillow inclui a borda final (y1) dos retângulos
+    camada = Image.new('RGBA', (largura, altura + 1), (0, 0, 0, 0))
+    desenhar_elementos(ImageDraw.Draw(camada), fixos)
+    caixa = camada.getbbox()
+    if caixa is None:
+        return None
+    return camada.crop(caixa), caixa[:2]
+
+
+# Uma seção pronta (fundo + camada fixa + textos do usuário). O gradiente é
+# igual em todas as linhas, então o bloco pode ser desenhado sozinho e colado
+# em qualquer y. A chave são os elementos da seção, que já trazem tudo o que
+# ela usa do plano: editar uma moeda redesenha só o bloco das moedas.
+@lru_cache(maxsize=MAX_BLOCOS)
+def bloco_secao(largura, altura, fixos, elementos):
+    bloco = fundo_gradiente(largura, altura + 1)
+    camada = sprite_fixo(largura, altura, fixos)
+    if camada:
+        sprite, posicao = camada
+        bloco.paste(sprite, posicao, sprite)
+    desenhar_elementos(ImageDraw.Draw(bloco), elementos)
+    return bloco
+
+
+# Função para gerar imagem: mede o layout primeiro e só então aloca uma
+# imagem com a altura exata do conteúdo. As seções vêm do cache de blocos;
+# só as que mudaram desde o último render são desenhadas.
+def gerar_imagem_resultado(dados, moedas_selecionadas):
+    layout = medir_layout(dados, moedas_selecionadas)
+
+    # Criar imagem com fundo gradiente (gerado uma vez e reaproveitado)
+    img = fundo_gradiente(layout.largura, layout.altura)
+
+    for secao in layout.secoes:
+        img.paste(bloco_secao(layout.largura, secao.altura, secao.fixos, secao.elementos), (0, secao.y))
+
+    return img
+
+
+# Função para gerar a imagem já codificada no formato pedido. Com
+# tamanho_max (bytes), busca a melhor qualidade que caiba nesse tamanho.
+def gerar_arquivo(dados, moedas_selecionadas, formato='jpeg', qualidade=None, tamanho_max=None):
+    with medir('render'):
+        img = gerar_imagem_resultado(dados, moedas_selecionadas)
+    with medir('codificar', formato=formato):
+        if tamanho_max:
+            return codificar_tamanho_alvo(img, formato, tamanho_max)
+        return codificar(img, formato, qualidade)
+
+
+# Tamanho e tempo de codificação do plano em cada formato (o app pede pela
+# fila de render)
+def comparar_formatos_plano(dados, moedas_selecionadas):
+    return comparar_formatos(gerar_imagem_resultado(dados, moedas_selecionadas))
+
+
+# Prévia leve (JPEG pequeno) para mostrar enquanto a imagem completa é
+# gerada na fila: o layout desenhado direto em 1/FATOR_PREVIA da escala, sem
+# desenhar (nem guardar) as seções em tamanho real neste processo. A camada
+# fixa de cada seção sai do cache de sprites, já na escala da prévia.
+def previa_plano(dados, moedas_selecionadas):
+    with medir('previa'):
+        layout = medir_layout(dados, moedas_selecionadas)
+        escala = 1 / FATOR_PREVIA
+        img = fundo_gradiente(round(layout.largura * escala), round(layout.altura * escala))
+        draw = ImageDraw.Draw(img)
+        for secao in layout.secoes:
+            y = round(secao.y * escala)
+            fixos = tuple(escalar_elemento(e, escala) for e in secao.fixos)
+            camada = sprite_fixo(img.width, round(secao.altura * escala), fixos)
+            if camada:
+                sprite, (x, y_sprite) = camada
+                img.paste(sprite, (x, y + y_sprite), sprite)
+            desenhar_elementos(draw, [escalar_elemento(e, escala, 0, y) for e in secao.elementos])
+        return codificar(img, 'jpeg', QUALIDADE_PREVIA)
+
+
+# Chave do arquivo gerado: muda com o plano, as opções de exportação e a
+# versão do desenho (serve também de ETag no serviço HTTP)
+def chave_imagem(dados, moedas_selecionadas, formato='jpeg', qualidade=None, tamanho_max=None):
+    return chave_plano(dados, moedas_selecionadas, formato, qualidade, tamanho_max, VERSAO_RENDER)
+
+
+# Guarda no cache o arquivo gerado em outro processo (os processos de render
+# não enxergam o cache deste); usado como `ao_concluir` da fila de render
+def guardar_resultado(chave, conteudo):
+    cache_imagens().guardar(chave, conteudo)
+
+
+# Arquivo do plano reaproveitando o cache de imagens: planos iguais (na mesma
+# sessão ou entre sessões) só são desenhados uma vez por formato
+def imagem_plano(dados, moedas_selecionadas, formato='jpeg', qualidade=None, tamanho_max=None):
+    chave = chave_imagem(dados, moedas_selecionadas, formato, qualidade, tamanho_max)
+    return cache_imagens().obter_ou_gerar(
+        chave, lambda: gerar_arquivo(dados, moedas_selecionadas, formato, qualidade, tamanho_max)
+    )
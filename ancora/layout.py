@@ -0,0 +1,170 @@
+# Layout da imagem do plano: mede todos os textos com as fontes reais e
+# calcula a posição de cada elemento antes de alocar a imagem
+from collections import namedtuple
+
+from ancora.plano import moedas_ordenadas
+from ancora.texto import largura_texto, quebrar_texto
+
+# Dimensões otimizadas para celular (1080px largura)
+LARGURA = 1080
+MARGEM = 60
+ESPACO_SECOES = 40
+MARGEM_INFERIOR = 80
+
+# Fontes como (peso, tamanho), resolvidas no registro de fontes
+FONTE_CABECALHO = ('bold', 60)
+FONTE_SUBCABECALHO = ('regular', 35)
+FONTE_LABEL = ('bold', 26)
+FONTE_OFERTA_NOME = ('bold', 42)
+FONTE_PRECO = ('bold', 55)
+FONTE_BOX_LABEL = ('bold', 28)
+FONTE_BOX_VALOR = ('regular', 30)
+FONTE_MOEDA_TITULO = ('bold', 38)
+FONTE_MOEDA_NOME = ('bold', 32)
+FONTE_MOEDA_DESC = ('regular', 28)
+FONTE_PRIORIDADE = ('bold', 24)
+
+# Altura de cada linha de texto quebrado
+LINHA_OFERTA = 48
+LINHA_DESCRICAO = 32
+
+ROTEIRO_ITENS = [
+    "1. Apresente a Oferta Principal",
+    "2. Se houver resistência, introduza a Âncora",
+    "3. Use concessões pela ordem de prioridade",
+    "4. Mantenha o preço principal intacto"
+]
+
+# Uma seção da imagem: elementos com coordenadas relativas ao topo (y) dela.
+# Cada elemento é uma tupla:
+#   ('retangulo', (x0, y0, x1, y1), cor, raio)
+#   ('linha', (x0, y0, x1, y1), cor, largura)
+#   ('texto', (x, y), texto, fonte, cor)
+# `fixos` não depende do texto do usuário, só das posições: caixas, rótulos
+# e o roteiro. São desenhados antes dos `elementos`. Os dois são tuplas, para
+# servir de chave nos caches de desenho.
+Secao = namedtuple('Secao', 'nome y altura fixos elementos')
+Layout = namedtuple('Layout', 'largura altura secoes')
+
+
+def _texto_centralizado(texto, spec, cor, y, largura):
+    return ('texto', ((largura - largura_texto(texto, spec)) // 2, y), texto, spec, cor)
+
+
+def _secao_cabecalho(dados, largura):
+    fixos = [_texto_centralizado("Plano de Negociação", FONTE_CABECALHO, (31, 41, 55), 80, largura)]
+    elementos = [_texto_centralizado(dados['profissao'], FONTE_SUBCABECALHO, (107, 114, 128), 160, largura)]
+    return 'cabecalho', 230, fixos, elementos
+
+
+def _secao_oferta(dados, largura):
+    linhas = quebrar_texto(dados['oferta_principal'], FONTE_OFERTA_NOME, largura - 2 * MARGEM - 60)
+    y_preco = 70 + LINHA_OFERTA * max(len(linhas), 1) + 27
+    altura = y_preco + 75
+    fixos = [
+        ('retangulo', (MARGEM, 0, largura - MARGEM, altura), (79, 70, 229), 20),
+        ('texto', (MARGEM + 30, 25), "OFERTA PRINCIPAL", FONTE_LABEL, (200, 200, 255)),
+    ]
+    elementos = []
+    for i, linha in enumerate(linhas):
+        elementos.append(('texto', (MARGEM + 30, 70 + i * LINHA_OFERTA), linha, FONTE_OFERTA_NOME, 'white'))
+    elementos.append(('texto', (MARGEM + 30, y_preco), dados['preco_principal'], FONTE_PRECO, 'white'))
+    return 'oferta', altura, fixos, elementos
+
+
+def _secao_ancora(dados, largura):
+    linhas = quebrar_texto(dados['nome_ancora'], FONTE_OFERTA_NOME, largura - 2 * MARGEM - 60)
+    y_boxes = 70 + LINHA_OFERTA * max(len(linhas), 1) + 20
+    altura = y_boxes + 95 + 47
+    content_width = largura - (MARGEM * 2)
+    box_width = (content_width - 40) // 2
+    cor_box = (150, 190, 255)
+    fixos = [
+        ('retangulo', (MARGEM, 0, largura - MARGEM, altura), (59, 130, 246), 20),
+        ('texto', (MARGEM + 30, 25), "OFERTA ÂNCORA", FONTE_LABEL, (200, 230, 255)),
+        # Box Preço
+        ('retangulo', (MARGEM + 30, y_boxes, MARGEM + 30 + box_width, y_boxes + 95), cor_box, 15),
+        ('texto', (MARGEM + 50, y_boxes + 18), "Preço", FONTE_BOX_LABEL, 'white'),
+        # Box Parcelamento
+        ('retangulo', (MARGEM + 50 + box_width, y_boxes, largura - MARGEM - 30, y_boxes + 95), cor_box, 15),
+        ('texto', (MARGEM + 70 + box_width, y_boxes + 18), "Parcelamento", FONTE_BOX_LABEL, 'white'),
+    ]
+    elementos = []
+    for i, linha in enumerate(linhas):
+        elementos.append(('texto', (MARGEM + 30, 70 + i * LINHA_OFERTA), linha, FONTE_OFERTA_NOME, 'white'))
+    elementos += [
+        ('texto', (MARGEM + 50, y_boxes + 52), f"{dados['preco_min']} - {dados['preco_max']}", FONTE_BOX_VALOR, 'white'),
+        ('texto', (MARGEM + 70 + box_width, y_boxes + 52), f"{dados['parc_min']} - {dados['parc_max']}", FONTE_BOX_VALOR, 'white'),
+    ]
+    return 'ancora', altura, fixos, elementos
+
+
+def _secao_moedas(moedas_selecionadas, largura):
+    fixos = [
+        ('texto', (MARGEM + 30, 30), "Concessões por Ordem de Prioridade", FONTE_MOEDA_TITULO, (31, 41, 55)),
+    ]
+    elementos = []
+    moeda_y = 90
+    for moeda_nome, moeda_info in moedas_ordenadas(moedas_selecionadas):
+        linhas = quebrar_texto(moeda_info['descricao'], FONTE_MOEDA_DESC, largura - 2 * MARGEM - 120)
+        # Box de 120px comporta até 2 linhas de descrição; cresce a partir daí
+        altura_box = 120 + LINHA_DESCRICAO * max(len(linhas) - 2, 0)
+        fixos += [
+            ('retangulo', (MARGEM + 30, moeda_y, largura - MARGEM - 30, moeda_y + altura_box), 'white', 15),
+            ('linha', (MARGEM + 30, moeda_y, MARGEM + 30, moeda_y + altura_box), (79, 70, 229), 8),
+            # Prioridade badge
+            ('retangulo', (MARGEM + 60, moeda_y + 12, MARGEM + 180, moeda_y + 45), (79, 70, 229), 8),
+        ]
+        elementos += [
+            ('texto', (MARGEM + 75, moeda_y + 17), moeda_info['prioridade'].split(' ')[0], FONTE_PRIORIDADE, 'white'),
+            ('texto', (MARGEM + 200, moeda_y + 12), moeda_nome, FONTE_MOEDA_NOME, (31, 41, 55)),
+        ]
+        for i, linha in enumerate(linhas):
+            elementos.append(('texto', (MARGEM + 60, moeda_y + 55 + i * LINHA_DESCRICAO), linha, FONTE_MOEDA_DESC, (107, 114, 128)))
+        moeda_y += altura_box + 20
+    altura = moeda_y + 10
+    fixos.insert(0, ('retangulo', (MARGEM, 0, largura - MARGEM, altura), (249, 250, 251), 20))
+    return 'moedas', altura, fixos, elementos
+
+
+def _secao_roteiro(largura):
+    altura = 280
+    fixos = [
+        ('retangulo', (MARGEM, 0, largura - MARGEM, altura), (255, 251, 235), 20),
+        ('texto', (MARGEM + 30, 30), "💡 Roteiro de Negociação", FONTE_MOEDA_TITULO, (31, 41, 55)),
+    ]
+    for i, item in enumerate(ROTEIRO_ITENS):
+        fixos.append(('texto', (MARGEM + 60, 90 + i * 50), item, FONTE_MOEDA_DESC, (55, 65, 81)))
+    return 'roteiro', altura, fixos, []
+
+
+# Mede o plano inteiro e devolve as seções já posicionadas e a altura exata
+def medir_layout(dados, moedas_selecionadas, largura=LARGURA):
+    partes = [
+        _secao_cabecalho(dados, largura),
+        _secao_oferta(dados, largura),
+        _secao_ancora(dados, largura),
+        _secao_moedas(moedas_selecionadas, largura),
+        _secao_roteiro(largura),
+    ]
+    secoes = []
+    y = 0
+    for i, (nome, altura, fixos, elementos) in enumerate(partes):
+        secoes.append(Secao(nome, y, altura, tuple(fixos), tuple(elementos)))
+        # O cabeçalho já inclui o espaço até a primeira caixa
+        y += altura + (ESPACO_SECOES if i else 0)
+    altura_total = y - ESPACO_SECOES + MARGEM_INFERIOR
+    return Layout(largura, altura_total, secoes)
+
+
+# Elemento de uma seção numa escala (para outro tamanho de tela), deslocado
+# em (dx, dy). O texto vai para a fonte do tamanho certo, não é esticado.
+def escalar_elemento(elemento, escala, dx=0, dy=0):
+    tipo = elemento[0]
+    if tipo == 'texto':
+        _, (x, y), texto, (peso, tamanho), cor = elemento
+        return ('texto', (round(x * escala) + dx, round(y * escala) + dy), texto,
+                (peso, max(round(tamanho * escala), 1)), cor)
+    _, (x0, y0, x1, y1), cor, medida = elemento
+    caixa = (round(x0 * escala) + dx, round(y0 * escala) + dy, round(x1 * escala) + dx, round(y1 * escala) + dy)
+    return (tipo, caixa, cor, max(round(medida * escala), 1))
@@ -0,0 +1,84 @@
+# Geração em lote: um plano por linha de um arquivo JSONL, em vários processos
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ancora.exportar import FORMATOS
+from ancora.imagem import imagem_plano
+from ancora.plano import normalizar_plano
+
+
+# Núcleos disponíveis para este processo (respeita limites de CPU do container)
+def numero_processos():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Nome do arquivo de saída: campo "id" do registro ou o número da linha
+def nome_arquivo(registro, numero_linha, extensao='jpg'):
+    base = str(registro.get('id') or '') if isinstance(registro, dict) else ''
+    base = re.sub(r'[^A-Za-z0-9._-]+', '-', base).strip('-.')
+    return f"{base or f'plano-{numero_linha:05d}'}.{extensao}"
+
+
+# Executado nos processos filhos: gera e grava um plano.
+# Retorna (numero_linha, arquivo, erro); erro é None quando deu certo.
+def renderizar_linha(numero_linha, linha, pasta_saida, formato='jpeg', tamanho_max=None):
+    arquivo = None
+    try:
+        registro = json.loads(linha)
+        arquivo = nome_arquivo(registro, numero_linha, FORMATOS[formato]['extensao'])
+        dados, moedas = normalizar_plano(registro)
+        conteudo = imagem_plano(dados, moedas, formato, tamanho_max=tamanho_max)
+        with open(os.path.join(pasta_saida, arquivo), 'wb') as f:
+            f.write(conteudo)
+        return numero_linha, arquivo, None
+    except Exception as e:
+        return numero_linha, arquivo, f"{type(e).__name__}: {e}"
+
+
+# Lê o JSONL e distribui os planos entre os processos. Mantém no máximo
+# alguns planos por processo em andamento, para não carregar o arquivo todo.
+# Retorna a lista de erros [(numero_linha, arquivo, mensagem)].
+def renderizar_arquivo(entrada, pasta_saida, processos=None, formato='jpeg', tamanho_max=None, progresso=sys.stderr):
+    os.makedirs(pasta_saida, exist_ok=True)
+    processos = processos or numero_processos()
+    limite = processos * 4
+    erros = []
+    feitos = 0
+    inicio = time.perf_counter()
+
+    def coletar(concluidos):
+        nonlocal feitos
+        for futuro in concluidos:
+            numero_linha, arquivo, erro = futuro.result()
+            feitos += 1
+            if erro:
+                erros.append((numero_linha, arquivo, erro))
+        if progresso:
+            decorrido = time.perf_counter() - inicio
+            progresso.write(f"\r{feitos} planos processados: {feitos - len(erros)} gerados, "
+                            f"{len(erros)} com erro ({feitos / decorrido:.1f}/s)")
+            progresso.flush()
+
+    with ProcessPoolExecutor(max_workers=processos) as executor, open(entrada, 'r', encoding='utf-8') as f:
+        pendentes = set()
+        for numero_linha, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            pendentes.add(executor.submit(renderizar_linha, numero_linha, linha, pasta_saida, formato, tamanho_max))
+            if len(pendentes) >= limite:
+                concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                coletar(concluidos)
+        if pendentes:
+            coletar(wait(pendentes).done)
+
+    if progresso:
+        progresso.write("\n")
+    erros.sort()
+    return erros
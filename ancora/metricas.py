@@ -0,0 +1,282 @@
+# Métricas de desempenho do app: tempos por etapa (spans), contadores de
+# reruns e gravação periódica em arquivo. Desligado por padrão; liga com
+# ANCORA_METRICAS=1. Desligado, cada medição custa uma chamada vazia.
+#
+#   ANCORA_METRICAS=1                      liga a coleta
+#   ANCORA_METRICAS_ARQUIVO=metricas.prom  grava a cada intervalo (.json grava JSON)
+#   ANCORA_METRICAS_INTERVALO=15           segundos entre gravações
+import json
+import os
+import threading
+import time
+
+ATIVO = os.environ.get('ANCORA_METRICAS', '').lower() in ('1', 'true', 'sim')
+
+# Limites dos histogramas, em ms
+LIMITES_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histograma:
+    def __init__(self):
+        self.contagem = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.baldes = [0] * (len(LIMITES_MS) + 1)
+
+    def observar(self, valor):
+        self.contagem += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+        for i, limite in enumerate(LIMITES_MS):
+            if valor <= limite:
+                self.baldes[i] += 1
+                return
+        self.baldes[-1] += 1
+
+    # Estimativa de percentil pelo limite superior do balde
+    def percentil(self, p):
+        alvo = self.contagem * p / 100
+        acumulado = 0
+        for i, n in enumerate(self.baldes):
+            acumulado += n
+            if acumulado >= alvo and n:
+                return LIMITES_MS[i] if i < len(LIMITES_MS) else self.maximo
+        return 0.0
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histogramas = {}
+        self.contadores = {}
+        # Valores instantâneos (ex.: tamanho da fila): nome -> função que
+        # devolve um dict de números, lida na hora de exportar
+        self.medidores = {}
+        self.inicio = time.time()
+
+    def observar(self, nome, valor_ms, rotulos=()):
+        chave = (nome, rotulos)
+        with self._lock:
+            histograma = self.histogramas.get(chave)
+            if histograma is None:
+                histograma = self.histogramas[chave] = Histograma()
+            histograma.observar(valor_ms)
+
+    def contar(self, nome, rotulos=(), valor=1):
+        chave = (nome, rotulos)
+        with self._lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def limpar(self):
+        with self._lock:
+            self.histogramas.clear()
+            self.contadores.clear()
+
+    def json(self):
+        with self._lock:
+            spans = [
+                {
+                    'nome': nome, 'rotulos': dict(rotulos), 'contagem': h.contagem,
+                    'soma_ms': h.soma, 'max_ms': h.maximo,
+                    'p50_ms': h.percentil(50), 'p90_ms': h.percentil(90), 'p99_ms': h.percentil(99)
+                }
+                for (nome, rotulos), h in sorted(self.histogramas.items(), key=_chave)
+            ]
+            contadores = [
+                {'nome': nome, 'rotulos': dict(rotulos), 'valor': valor}
+                for (nome, rotulos), valor in sorted(self.contadores.items(), key=_chave)
+            ]
+            medidores = dict(self.medidores)
+        return {'inicio': self.inicio, 'agora': time.time(), 'spans': spans,
+                'contadores': contadores, 'cache': _estatisticas_cache(),
+                **{nome: funcao() for nome, funcao in medidores.items()}}
+
+    # Formato texto do Prometheus
+    def prometheus(self):
+        linhas = [
+            '# HELP ancora_span_ms Duração das etapas do app em ms',
+            '# TYPE ancora_span_ms histogram',
+        ]
+        with self._lock:
+            for (nome, rotulos), h in sorted(self.histogramas.items(), key=_chave):
+                base = _rotulos({'span': nome, **dict(rotulos)})
+                acumulado = 0
+                for limite, n in zip(LIMITES_MS + ('+Inf',), h.baldes):
+                    acumulado += n
+                    linhas.append(f'ancora_span_ms_bucket{base[:-1]},le="{limite}"}} {acumulado}')
+                linhas.append(f'ancora_span_ms_sum{base} {h.soma:.3f}')
+                linhas.append(f'ancora_span_ms_count{base} {h.contagem}')
+            nomes = sorted({nome for nome, _ in self.contadores})
+            for nome in nomes:
+                linhas.append(f'# TYPE ancora_{nome}_total counter')
+                for (n, rotulos), valor in sorted(self.contadores.items(), key=_chave):
+                    if n == nome:
+                        linhas.append(f'ancora_{nome}_total{_rotulos(dict(rotulos))} {valor}')
+            medidores = dict(self.medidores)
+        for nome, valor in _estatisticas_cache().items():
+            linhas.append(f'ancora_cache_{nome} {valor}')
+        for grupo, funcao in medidores.items():
+            for nome, valor in funcao().items():
+                linhas.append(f'ancora_{grupo}_{nome} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _chave(item):
+    return item[0]
+
+
+# Rótulos viram tupla ordenada de textos, para servir de chave
+def _normalizar(rotulos):
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ''
+    pares = ','.join(f'{k}="{str(v)}"' for k, v in sorted(rotulos.items()))
+    return '{' + pares + '}'
+
+
+def _estatisticas_cache():
+    from ancora.cache_imagens import cache_imagens
+    return cache_imagens().estatisticas()
+
+
+# Registro único do processo (compartilhado entre sessões e reruns)
+registro = Registro()
+
+
+class _Span:
+    __slots__ = ('nome', 'rotulos', 'inicio')
+
+    def __init__(self, nome, rotulos):
+        self.nome = nome
+        self.rotulos = rotulos
+        self.inicio = time.perf_counter()
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.fim()
+
+    # Encerra o span; rótulos extras podem ser informados só no fim
+    def fim(self, **rotulos):
+        todos = tuple(sorted(self.rotulos + _normalizar(rotulos))) if rotulos else self.rotulos
+        _observar(self.nome, (time.perf_counter() - self.inicio) * 1000, todos)
+
+
+class _SpanVazio:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def fim(self, **rotulos):
+        pass
+
+
+_SPAN_VAZIO = _SpanVazio()
+
+
+# Uso: `with medir('render'):` ou `span = medir('rerun')` ... `span.fim(etapa=2)`
+def medir(nome, **rotulos):
+    if not ATIVO:
+        return _SPAN_VAZIO
+    return _Span(nome, _normalizar(rotulos))
+
+
+def contar(nome, valor=1, **rotulos):
+    if ATIVO:
+        registro.contar(nome, _normalizar(rotulos), valor)
+        _iniciar_gravacao()
+
+
+# Registra uma duração medida fora de um span (ex.: espera na fila)
+def observar(nome, valor_ms, **rotulos):
+    if ATIVO:
+        _observar(nome, valor_ms, _normalizar(rotulos))
+
+
+# Observações do trabalho em andamento num processo de render (ver
+# executar_medindo); None fora dele
+_capturadas = None
+
+
+def _observar(nome, valor_ms, rotulos):
+    if _capturadas is not None:
+        _capturadas.append((nome, valor_ms, rotulos))
+        return
+    registro.observar(nome, valor_ms, rotulos)
+    _iniciar_gravacao()
+
+
+# Roda `funcao` num processo de render e devolve (resultado, observações):
+# os tempos medidos lá (render, codificar...) voltam com o resultado para o
+# registro do app, em vez de ficar num registro que ninguém lê
+def executar_medindo(funcao, *args):
+    global _capturadas
+    if not ATIVO:
+        return funcao(*args), ()
+    _capturadas = []
+    try:
+        return funcao(*args), _capturadas
+    finally:
+        _capturadas = None
+
+
+# Junta ao registro deste processo as observações de executar_medindo
+def registrar_observacoes(observacoes):
+    for nome, valor_ms, rotulos in observacoes:
+        _observar(nome, valor_ms, rotulos)
+
+
+# `funcao` é chamada a cada exportação e devolve {nome: número}
+def registrar_medidor(grupo, funcao):
+    with registro._lock:
+        registro.medidores[grupo] = funcao
+
+
+def gravar(caminho):
+    if caminho.endswith('.json'):
+        conteudo = json.dumps(registro.json(), ensure_ascii=False, indent=2)
+    else:
+        conteudo = registro.prometheus()
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+_gravacao_iniciada = False
+_lock_gravacao = threading.Lock()
+
+
+# Thread de fundo que grava o arquivo de métricas periodicamente
+def _iniciar_gravacao():
+    global _gravacao_iniciada
+    if _gravacao_iniciada:
+        return
+    with _lock_gravacao:
+        if _gravacao_iniciada:
+            return
+        _gravacao_iniciada = True
+        caminho = os.environ.get('ANCORA_METRICAS_ARQUIVO')
+        if not caminho:
+            return
+        intervalo = float(os.environ.get('ANCORA_METRICAS_INTERVALO', '15'))
+
+        def laco():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    gravar(caminho)
+                except Exception:
+                    # Métrica nunca derruba o app; tenta de novo no próximo ciclo
+                    pass
+
+        threading.Thread(target=laco, name='metricas', daemon=True).start()
@@ -0,0 +1,103 @@
+# Dados de um plano de negociação fora da sessão do Streamlit
+# (arquivos JSONL, lotes e serviços)
+import hashlib
+import json
+
+# Opções de prioridade das moedas de troca, na ordem do índice
+PRIORIDADES = ['1ª opção (oferecer primeiro)', '2ª opção', '3ª opção - Última opção (só se necessário)']
+
+# Campos de st.session_state.dados usados na imagem
+CAMPOS_DADOS = [
+    'profissao',
+    'oferta_principal',
+    'preco_principal',
+    'nome_ancora',
+    'preco_min',
+    'preco_max',
+    'parc_min',
+    'parc_max'
+]
+
+# Campos que a etapa 2 permite deixar em branco
+CAMPOS_OPCIONAIS = ('parc_min', 'parc_max')
+
+
+class PlanoInvalido(ValueError):
+    pass
+
+
+# Converte um registro de plano no par (dados, moedas_selecionadas) usado
+# pela imagem. Aceita o mesmo formato da sessão:
+#   {"dados": {...}, "moedas_selecionadas": {"Bonificação": {"descricao": "...", "prioridade_index": 0}}}
+# ou as moedas como lista: "moedas": [{"nome": "...", "descricao": "...", "prioridade": 1}]
+def normalizar_plano(registro):
+    if not isinstance(registro, dict):
+        raise PlanoInvalido("o plano deve ser um objeto JSON")
+
+    dados_registro = registro.get('dados', registro)
+    if not isinstance(dados_registro, dict):
+        raise PlanoInvalido("`dados` deve ser um objeto JSON")
+    faltando = [c for c in CAMPOS_DADOS if c not in dados_registro and c not in CAMPOS_OPCIONAIS]
+    if faltando:
+        raise PlanoInvalido(f"campos obrigatórios ausentes: {', '.join(faltando)}")
+    dados = {c: str(dados_registro.get(c, '')) for c in CAMPOS_DADOS}
+
+    if 'moedas_selecionadas' in registro:
+        selecionadas = registro['moedas_selecionadas']
+        if not isinstance(selecionadas, dict):
+            raise PlanoInvalido("`moedas_selecionadas` deve ser um objeto JSON")
+        if not all(isinstance(info, dict) for info in selecionadas.values()):
+            raise PlanoInvalido("cada moeda em `moedas_selecionadas` deve ser um objeto JSON")
+        itens = [dict(info, nome=nome) for nome, info in selecionadas.items()]
+    else:
+        itens = registro.get('moedas', [])
+        if not isinstance(itens, list):
+            raise PlanoInvalido("`moedas` deve ser uma lista")
+
+    moedas = {}
+    for item in itens:
+        if not isinstance(item, dict):
+            raise PlanoInvalido("cada item de `moedas` deve ser um objeto JSON")
+        nome = item.get('nome')
+        descricao = item.get('descricao')
+        if not nome or not descricao:
+            raise PlanoInvalido("cada moeda precisa de nome e descricao")
+        if not isinstance(nome, str):
+            raise PlanoInvalido("o nome de cada moeda deve ser um texto")
+        try:
+            if 'prioridade_index' in item:
+                indice = int(item['prioridade_index'])
+            else:
+                indice = int(item.get('prioridade', 1)) - 1
+        except (TypeError, ValueError):
+            raise PlanoInvalido(f"prioridade inválida para {nome}") from None
+        if not 0 <= indice < len(PRIORIDADES):
+            raise PlanoInvalido(f"prioridade inválida para {nome}")
+        moedas[nome] = {
+            'descricao': str(descricao),
+            'prioridade': PRIORIDADES[indice],
+            'prioridade_index': indice
+        }
+    if not moedas:
+        raise PlanoInvalido("selecione pelo menos uma moeda de troca")
+    return dados, moedas
+
+
+# Moedas na ordem em que aparecem no plano (prioridade; empate mantém a
+# ordem de seleção)
+def moedas_ordenadas(moedas_selecionadas):
+    return sorted(moedas_selecionadas.items(), key=lambda x: x[1]['prioridade_index'])
+
+
+# Hash estável do plano: mesmos dados e moedas na mesma ordem geram a mesma
+# chave, em qualquer sessão ou processo. `extras` diferencia versões do
+# desenho e opções de exportação.
+def chave_plano(dados, moedas_selecionadas, *extras):
+    normalizado = [
+        [str(dados.get(c, '')) for c in CAMPOS_DADOS],
+        [[nome, info['descricao'], info['prioridade'], info['prioridade_index']]
+         for nome, info in moedas_ordenadas(moedas_selecionadas)],
+        list(extras)
+    ]
+    texto = json.dumps(normalizado, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
@@ -0,0 +1,153 @@
+# Catálogo de profissões (com exemplos) lido de profissoes.json ou .csv,
+# recarregado só quando o arquivo muda, com busca sem acentos por prefixo
+# e aproximada para o seletor da etapa 1
+import csv
+import difflib
+import json
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+from ancora.arquivo_vigiado import ArquivoVigiado, arquivo_vigiado
+
+# Campos do exemplo de cada profissão (todos opcionais no arquivo)
+CAMPOS_EXEMPLO = ('oferta_principal', 'preco_principal', 'ancora', 'ancora_exemplo')
+
+# Semelhança mínima (0-1) de uma palavra na busca aproximada
+CORTE_APROXIMADO = 0.75
+
+# Máximo de profissões enviadas ao seletor da etapa 1
+LIMITE_OPCOES = 50
+
+
+# Minúsculas sem acentos: "Clínico" e "clinico" viram a mesma chave
+@lru_cache(maxsize=4096)
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFD', texto.casefold())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).strip()
+
+
+def _palavras(texto):
+    return [p for p in re.split(r'[^0-9a-z]+', normalizar(texto)) if p]
+
+
+# Valor de um campo como texto: números também valem ("preco_principal": 1200)
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+# Lê as linhas do arquivo: JSON (lista de objetos) ou CSV com cabeçalho.
+# Cada item tem `nome` e, se houver exemplo, os CAMPOS_EXEMPLO. Itens que não
+# são objetos ou não têm nome são pulados; um JSON que não é lista é erro.
+def ler_profissoes(arquivo, formato):
+    if formato == 'csv':
+        itens = csv.DictReader(arquivo)
+    else:
+        itens = json.load(arquivo)
+        if not isinstance(itens, list):
+            raise ValueError("o JSON de profissões deve ser uma lista de objetos")
+    profissoes = []
+    vistos = set()
+    exemplos = {}
+    for item in itens:
+        if not isinstance(item, dict):
+            continue
+        nome = _texto(item.get('nome'))
+        if not nome or nome in vistos:
+            continue
+        vistos.add(nome)
+        profissoes.append(nome)
+        exemplo = {campo: _texto(item.get(campo)) for campo in CAMPOS_EXEMPLO}
+        if exemplo['oferta_principal'] and exemplo['preco_principal']:
+            exemplos[nome] = exemplo
+    return profissoes, exemplos
+
+
+# Uma versão do catálogo, montada de uma vez e nunca alterada
+class Catalogo:
+    def __init__(self, profissoes, exemplos):
+        self.profissoes = tuple(profissoes)
+        self.exemplos = exemplos
+        # (palavra normalizada, posição): um prefixo vira uma faixa da lista
+        # ordenada, achada por busca binária
+        self._palavras = sorted(
+            (palavra, i) for i, nome in enumerate(self.profissoes) for palavra in set(_palavras(nome))
+        )
+        self._chaves = [palavra for palavra, _ in self._palavras]
+        self._vocabulario = sorted(set(self._chaves))
+
+    def exemplo(self, nome):
+        return self.exemplos.get(nome)
+
+    # Posições das profissões com alguma palavra começando por `prefixo`
+    def _com_prefixo(self, prefixo):
+        encontradas = set()
+        i = bisect_left(self._chaves, prefixo)
+        while i < len(self._chaves) and self._chaves[i].startswith(prefixo):
+            encontradas.add(self._palavras[i][1])
+            i += 1
+        return encontradas
+
+    # Profissões que batem com a busca, na ordem do catálogo. Cada palavra da
+    # busca precisa casar com o começo de uma palavra do nome; se nada casar,
+    # cada palavra é trocada pelas mais parecidas do vocabulário (erros de
+    # digitação, como "dentsta").
+    def buscar(self, texto, limite=LIMITE_OPCOES):
+        termos = _palavras(texto)
+        if not termos:
+            return list(self.profissoes[:limite])
+        posicoes = self._casar(termos)
+        if not posicoes:
+            posicoes = self._casar_aproximado(termos)
+        return [self.profissoes[i] for i in sorted(posicoes)[:limite]]
+
+    def _casar(self, termos):
+        posicoes = None
+        for termo in termos:
+            encontradas = self._com_prefixo(termo)
+            posicoes = encontradas if posicoes is None else posicoes & encontradas
+            if not posicoes:
+                return set()
+        return posicoes
+
+    def _casar_aproximado(self, termos):
+        posicoes = None
+        for termo in termos:
+            encontradas = self._com_prefixo(termo)
+            for parecida in difflib.get_close_matches(termo, self._vocabulario, n=5, cutoff=CORTE_APROXIMADO):
+                encontradas |= self._com_prefixo(parecida)
+            posicoes = encontradas if posicoes is None else posicoes & encontradas
+            if not posicoes:
+                return set()
+        return posicoes
+
+
+# Catálogo do arquivo, relido quando muda. Um arquivo com erro mantém a
+# versão anterior (e o erro fica em `erro`).
+class IndiceProfissoes(ArquivoVigiado):
+    def __init__(self, caminho):
+        formato = 'csv' if caminho.lower().endswith('.csv') else 'json'
+        super().__init__(
+            caminho, lambda f: Catalogo(*ler_profissoes(f, formato)), Catalogo([], {}),
+            erros=(ValueError, csv.Error), newline=''
+        )
+
+    def catalogo(self):
+        return self.valor()
+
+
+def indice_profissoes(caminho='profissoes.json'):
+    return arquivo_vigiado(IndiceProfissoes, caminho)
+
+
+# Índice do arquivo configurado (ANCORA_PROFISSOES_ARQUIVO, .json ou .csv)
+def indice_configurado():
+    return indice_profissoes(os.environ.get('ANCORA_PROFISSOES_ARQUIVO', 'profissoes.json'))
+
+
+# Catálogo do arquivo configurado. FileNotFoundError sobe para quem chamou
+# avisar que falta o arquivo.
+def catalogo_profissoes():
+    return indice_configurado().catalogo()
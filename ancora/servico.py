@@ -0,0 +1,153 @@
+# Serviço HTTP local que recebe um plano em JSON e devolve a imagem,
+# para o CRM gerar planos sem passar pelas etapas do app
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ancora import metricas
+from ancora.cache_imagens import cache_imagens
+from ancora.exportar import FORMATOS
+from ancora.fila import FilaCheia, FilaRender
+from ancora.imagem import chave_imagem, imagem_plano
+from ancora.lote import numero_processos
+from ancora.plano import PlanoInvalido, normalizar_plano
+
+# Maior corpo aceito em um pedido (um plano tem poucos KB)
+TAMANHO_MAX_PEDIDO = 256 * 1024
+
+
+class ManipuladorRender(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre pedidos (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MetodoAncora'
+    # Conexões paradas por mais que isso são fechadas
+    timeout = 30
+
+    def log_message(self, formato, *args):
+        if not self.server.silencioso:
+            super().log_message(formato, *args)
+
+    def _responder(self, status, corpo=b'', tipo='application/json', cabecalhos=None):
+        self.send_response(status)
+        if corpo or status != 304:
+            self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        if corpo and self.command != 'HEAD':
+            self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem, cabecalhos=None):
+        corpo = json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8')
+        self._responder(status, corpo, cabecalhos=cabecalhos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/metricas':
+            if parse_qs(url.query).get('formato') == ['json']:
+                corpo, tipo = json.dumps(metricas.registro.json()).encode('utf-8'), 'application/json'
+            else:
+                corpo, tipo = metricas.registro.prometheus().encode('utf-8'), 'text/plain; version=0.0.4'
+            self._responder(200, corpo, tipo)
+        elif url.path == '/saude':
+            corpo = json.dumps({
+                'fila': self.server.fila.estatisticas(),
+                'cache': cache_imagens().estatisticas()
+            }).encode('utf-8')
+            self._responder(200, corpo)
+        else:
+            self._erro(404, 'caminho não encontrado')
+
+    # Lê o corpo inteiro antes de responder: bytes que sobrassem na conexão
+    # seriam lidos como o próximo pedido (keep-alive). Devolve None depois de
+    # responder com erro; nesses casos a conexão é fechada.
+    def _ler_corpo(self):
+        if self.headers.get('Transfer-Encoding'):
+            self.close_connection = True
+            self._erro(411, 'envie o plano com Content-Length')
+            return None
+        try:
+            tamanho = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0:
+            self.close_connection = True
+            self._erro(400, 'Content-Length inválido')
+            return None
+        if tamanho > TAMANHO_MAX_PEDIDO:
+            self.close_connection = True
+            self._erro(413, 'plano grande demais')
+            return None
+        return self.rfile.read(tamanho)
+
+    # POST /render?formato=jpeg|webp|png&tamanho_max=<KB> com o plano no corpo
+    def do_POST(self):
+        corpo = self._ler_corpo()
+        if corpo is None:
+            return
+        url = urlparse(self.path)
+        if url.path != '/render':
+            self._erro(404, 'caminho não encontrado')
+            return
+
+        parametros = parse_qs(url.query)
+        formato = parametros.get('formato', ['jpeg'])[0]
+        if formato not in FORMATOS:
+            self._erro(400, f"formato desconhecido: {formato}")
+            return
+        try:
+            tamanho_max = int(parametros.get('tamanho_max', ['0'])[0]) * 1024 or None
+            if tamanho_max is not None and tamanho_max < 0:
+                raise ValueError("tamanho_max deve ser positivo")
+            dados, moedas = normalizar_plano(json.loads(corpo))
+        except (ValueError, TypeError, PlanoInvalido) as e:
+            self._erro(400, str(e))
+            return
+
+        # O ETag é a chave do plano: se o cliente já tem essa versão, nem desenha
+        etag = f'"{chave_imagem(dados, moedas, formato, None, tamanho_max)}"'
+        cabecalhos = {'ETag': etag, 'Cache-Control': 'private, max-age=0, must-revalidate'}
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self._responder(304, cabecalhos=cabecalhos)
+            return
+
+        try:
+            futuro = self.server.fila.submeter(imagem_plano, dados, moedas, formato, None, tamanho_max)
+        except FilaCheia:
+            self._erro(429, 'servidor ocupado, tente novamente', {'Retry-After': '1'})
+            return
+        metricas.contar('pedidos_render', formato=formato)
+        try:
+            conteudo = futuro.result(timeout=self.server.tempo_limite)
+        except Exception as e:
+            self._erro(500, f"falha ao gerar a imagem: {type(e).__name__}")
+            return
+        self._responder(200, conteudo, FORMATOS[formato]['mime'], cabecalhos)
+
+
+class ServidorRender(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, trabalhadores=None, tamanho_fila=None, tempo_limite=30, silencioso=False):
+        super().__init__(endereco, ManipuladorRender)
+        trabalhadores = trabalhadores or numero_processos()
+        self.fila = FilaRender(trabalhadores, trabalhadores * 4 if tamanho_fila is None else tamanho_fila)
+        self.tempo_limite = tempo_limite
+        self.silencioso = silencioso
+
+    def server_close(self):
+        super().server_close()
+        self.fila.encerrar()
+
+
+def servir(host='127.0.0.1', porta=8600, trabalhadores=None, tamanho_fila=None):
+    servidor = ServidorRender((host, porta), trabalhadores, tamanho_fila)
+    print(f"Servindo em http://{host}:{servidor.server_address[1]}/render "
+          f"({servidor.fila.trabalhadores} trabalhadores, fila de {servidor.fila.tamanho_fila})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
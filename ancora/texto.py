@@ -0,0 +1,136 @@
+# Medição e quebra de texto por largura em pixels, com cache das medidas
+from functools import lru_cache
+
+from ancora.fontes import cobertura, fonte
+
+FAMILIA = 'DejaVuSans'
+
+# Cadeia de fontes: cada caractere vai para a primeira que o desenha. O que
+# nenhuma cobre fica com a FAMILIA (e, sem ela instalada, com a padrão do Pillow).
+FAMILIAS = (FAMILIA, 'NotoSansSymbols2', 'NotoEmoji', 'Symbola')
+
+# Seletores de variação e o ZWJ (de emoji compostos) seguem o caractere anterior
+JUNTORES = frozenset((0x200D, 0xFE0E, 0xFE0F))
+
+
+# Fonte a partir de (peso, tamanho)
+def fonte_spec(spec):
+    peso, tamanho = spec
+    return fonte(FAMILIA, peso, tamanho)
+
+
+# Divide o texto em trechos (texto, família), cada um com a primeira fonte
+# da cadeia que cobre os seus caracteres. Só depende do texto e do peso.
+@lru_cache(maxsize=4096)
+def trechos(texto, peso):
+    if texto.isascii():
+        return ((texto, FAMILIA),)
+    coberturas = [(familia, cobertura(familia, peso)) for familia in FAMILIAS]
+    partes = []
+    atual = inicio = None
+    for i, c in enumerate(texto):
+        cp = ord(c)
+        if cp in JUNTORES and atual is not None:
+            continue
+        familia = next((f for f, codepoints in coberturas if cp in codepoints), FAMILIA)
+        if familia != atual:
+            if atual is not None:
+                partes.append((texto[inicio:i], atual))
+            atual, inicio = familia, i
+    if atual is not None:
+        partes.append((texto[inicio:], atual))
+    return tuple(partes) or ((texto, FAMILIA),)
+
+
+# Avanço horizontal (em px) de uma palavra ou caractere. Palavras se repetem
+# muito entre planos, então a maioria das medidas não chega ao FreeType.
+@lru_cache(maxsize=8192)
+def avanco(texto, spec):
+    peso, tamanho = spec
+    return sum(fonte(familia, peso, tamanho).getlength(parte) for parte, familia in trechos(texto, peso))
+
+
+# Largura visível (caixa do desenho) de um texto em uma linha só
+@lru_cache(maxsize=1024)
+def largura_texto(texto, spec):
+    peso, tamanho = spec
+    partes = trechos(texto, peso)
+    if len(partes) == 1:
+        bbox = fonte(partes[0][1], peso, tamanho).getbbox(texto)
+        return bbox[2] - bbox[0]
+    x = 0
+    esquerda = direita = None
+    for parte, familia in partes:
+        f = fonte(familia, peso, tamanho)
+        bbox = f.getbbox(parte)
+        if esquerda is None:
+            esquerda = bbox[0]
+        direita = x + bbox[2]
+        x += f.getlength(parte)
+    return direita - esquerda
+
+
+# Desenha o texto trecho a trecho, cada um com a sua fonte, alinhando as
+# linhas de base pela fonte principal
+def desenhar_texto(draw, posicao, texto, spec, cor):
+    peso, tamanho = spec
+    partes = trechos(texto, peso)
+    if len(partes) == 1:
+        draw.text(posicao, texto, fill=cor, font=fonte(partes[0][1], peso, tamanho))
+        return
+    x, y = posicao
+    base = ascendente(spec)
+    for parte, familia in partes:
+        f = fonte(familia, peso, tamanho)
+        draw.text((x, y + base - f.getmetrics()[0]), parte, fill=cor, font=f)
+        x += f.getlength(parte)
+
+
+# Quebra uma palavra maior que a linha caractere a caractere
+def _partir_palavra(palavra, spec, largura_max):
+    partes = []
+    atual = ''
+    largura_atual = 0
+    for c in palavra:
+        lc = avanco(c, spec)
+        if atual and largura_atual + lc > largura_max:
+            partes.append(atual)
+            atual, largura_atual = '', 0
+        atual += c
+        largura_atual += lc
+    partes.append(atual)
+    return partes
+
+
+# Quebra o texto em linhas que cabem em largura_max pixels. A largura da linha
+# é a soma das palavras e espaços já medidos, sem medir a linha inteira.
+@lru_cache(maxsize=1024)
+def quebrar_texto(texto, spec, largura_max):
+    espaco = avanco(' ', spec)
+    linhas = []
+    atual = []
+    largura_atual = 0
+    for palavra in texto.split():
+        lp = avanco(palavra, spec)
+        if lp > largura_max:
+            if atual:
+                linhas.append(' '.join(atual))
+            *completas, resto = _partir_palavra(palavra, spec, largura_max)
+            linhas += completas
+            atual, largura_atual = [resto], avanco(resto, spec)
+        elif atual and largura_atual + espaco + lp > largura_max:
+            linhas.append(' '.join(atual))
+            atual, largura_atual = [palavra], lp
+        else:
+            largura_atual += (espaco if atual else 0) + lp
+            atual.append(palavra)
+    if atual:
+        linhas.append(' '.join(atual))
+    return tuple(linhas)
+
+
+# Distância do topo do texto (onde o Pillow posiciona) até a linha de base,
+# usada pelas exportações vetoriais
+@lru_cache(maxsize=None)
+def ascendente(spec):
+    return fonte_spec(spec).getmetrics()[0]
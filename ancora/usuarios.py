@@ -0,0 +1,98 @@
+# Índice de usuários lido de usuarios.txt, recarregado só quando o arquivo muda
+import os
+from datetime import datetime
+
+from ancora.arquivo_vigiado import ArquivoVigiado, arquivo_vigiado
+from ancora.auditoria import registrar_evento
+
+FORMATO_DATA = '%Y-%m-%d'
+
+
+# Interpreta uma linha "email,codigo,AAAA-MM-DD".
+# Retorna (email, codigo, expiracao) ou None se a linha for malformada;
+# data inválida vira None para o login avisar o suporte.
+def ler_linha(linha):
+    partes = linha.strip().split(',')
+    if len(partes) < 3 or not partes[0].strip() or not partes[1].strip():
+        return None
+    try:
+        expiracao = datetime.strptime(partes[2].strip(), FORMATO_DATA)
+    except ValueError:
+        expiracao = None
+    return partes[0].strip().lower(), partes[1].strip(), expiracao
+
+
+# Monta o dicionário de usuários a partir das linhas do arquivo.
+# Linhas malformadas são ignoradas; em emails repetidos vale a última linha.
+def ler_usuarios(linhas):
+    usuarios = {}
+    ignoradas = 0
+    for linha in linhas:
+        if not linha.strip():
+            continue
+        registro = ler_linha(linha)
+        if registro is None:
+            ignoradas += 1
+            continue
+        email, codigo, expiracao = registro
+        usuarios[email] = {
+            'codigo': codigo,
+            'expiracao': expiracao
+        }
+    return usuarios, ignoradas
+
+
+class IndiceUsuarios(ArquivoVigiado):
+    def __init__(self, caminho):
+        super().__init__(caminho, ler_usuarios, ({}, 0))
+
+    # Dicionário atual de usuários (recarregado se o arquivo mudou)
+    def usuarios(self):
+        return self.valor()[0]
+
+    # Linhas malformadas ignoradas na última leitura
+    @property
+    def ignoradas(self):
+        return self._valor[1]
+
+    def buscar(self, email):
+        return self.usuarios().get(email.strip().lower())
+
+
+def indice_usuarios(caminho='usuarios.txt'):
+    return arquivo_vigiado(IndiceUsuarios, caminho)
+
+
+# Escolhe onde ficam os usuários: banco SQLite se ANCORA_USUARIOS_DB estiver
+# definido, senão o arquivo texto (ANCORA_USUARIOS_ARQUIVO ou usuarios.txt)
+def fonte_usuarios():
+    banco = os.environ.get('ANCORA_USUARIOS_DB')
+    if banco:
+        from ancora.banco_usuarios import banco_usuarios
+        return banco_usuarios(banco)
+    return indice_usuarios(os.environ.get('ANCORA_USUARIOS_ARQUIVO', 'usuarios.txt'))
+
+
+# Valida email e código na base configurada. Retorna (valido, mensagem).
+# FileNotFoundError sobe para quem chamou avisar que falta a base.
+def validar_acesso(email, codigo, fonte=None):
+    fonte = fonte or fonte_usuarios()
+    usuario = fonte.buscar(email)
+    codigo = codigo.strip()
+    email = email.strip().lower()
+
+    if usuario is None or usuario['codigo'] != codigo:
+        registrar_evento('login', email=email, resultado='negado')
+        return False, "Acesso negado. Verifique seu email e código."
+
+    # Data de expiração já convertida ao carregar a base
+    data_expiracao = usuario['expiracao']
+    if data_expiracao is None:
+        registrar_evento('login', email=email, resultado='data_invalida')
+        return False, "Erro ao verificar validade do acesso. Contate o suporte."
+    if datetime.now() > data_expiracao:
+        registrar_evento('login', email=email, resultado='expirado')
+        return False, "Seu acesso expirou. Entre em contato com o suporte para renovar."
+
+    registrar_evento('login', email=email, resultado='ok')
+    return True, "Acesso autorizado!"
@@ -0,0 +1,67 @@
+# Variantes do plano em vários tamanhos (stories, feed, A4) a partir de um
+# único layout. O layout é medido uma vez, na largura base; cada variante o
+# desenha numa escala própria (textos na fonte do tamanho certo, não uma
+# imagem esticada), centralizado numa tela do tamanho do destino.
+import io
+import zipfile
+
+from ancora.exportar import FORMATOS, codificar
+from ancora.gradiente import fundo_gradiente
+from ancora.imagem import VERSAO_RENDER, desenhar_escalado
+from ancora.layout import medir_layout
+from ancora.metricas import medir
+from ancora.plano import chave_plano
+
+VARIANTES = {
+    'stories': {'rotulo': 'Stories', 'tamanho': (1080, 1920)},
+    'feed': {'rotulo': 'Feed', 'tamanho': (1080, 1350)},
+    # A4 em 300 dpi
+    'a4': {'rotulo': 'A4', 'tamanho': (2480, 3508)},
+}
+
+# Espaço mínimo em volta do plano, em fração do lado da tela
+MARGEM_TELA = 0.04
+
+
+# Desenha o layout (já medido) na tela de uma variante: escala para caber
+# com margem e centraliza
+def desenhar_variante(layout, variante):
+    largura, altura = VARIANTES[variante]['tamanho']
+    escala = min(largura * (1 - 2 * MARGEM_TELA) / layout.largura,
+                 altura * (1 - 2 * MARGEM_TELA) / layout.altura)
+    dx = (largura - round(layout.largura * escala)) // 2
+    dy = (altura - round(layout.altura * escala)) // 2
+    img = fundo_gradiente(largura, altura)
+    desenhar_escalado(img, layout, escala, dx, dy)
+    return img
+
+
+def _arquivo_variante(layout, variante, formato):
+    with medir('variante', variante=variante):
+        return codificar(desenhar_variante(layout, variante), formato)
+
+
+# Todas as variantes codificadas, {nome: bytes}, uma depois da outra: o ZIP
+# roda num processo da fila de render, que já é a unidade de paralelismo
+def gerar_variantes(dados, moedas_selecionadas, formato='jpeg', variantes=tuple(VARIANTES)):
+    layout = medir_layout(dados, moedas_selecionadas)
+    return {v: _arquivo_variante(layout, v, formato) for v in variantes}
+
+
+# Chave do ZIP no cache de imagens
+def chave_variantes(dados, moedas_selecionadas, formato='jpeg'):
+    return chave_plano(dados, moedas_selecionadas, 'variantes', formato, VERSAO_RENDER)
+
+
+# ZIP com todas as variantes (sem compressão: JPEG/WebP/PNG já são
+# comprimidos). O app gera pela fila de render e guarda o resultado no cache
+# com chave_variantes.
+def zip_variantes(dados, moedas_selecionadas, formato='jpeg'):
+    with medir('variantes'):
+        arquivos = gerar_variantes(dados, moedas_selecionadas, formato)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as arquivo_zip:
+        for variante, conteudo in arquivos.items():
+            largura, altura = VARIANTES[variante]['tamanho']
+            arquivo_zip.writestr(f"plano-{variante}-{largura}x{altura}.{FORMATOS[formato]['extensao']}", conteudo)
+    return buf.getvalue()
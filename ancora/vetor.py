@@ -0,0 +1,166 @@
+# Exportação vetorial do plano (SVG e PDF) a partir do mesmo layout da
+# imagem: só texto, poucos KB e nítida em qualquer tamanho de impressão
+import zlib
+from xml.sax.saxutils import escape, quoteattr
+
+from ancora.gradiente import CORES_FUNDO
+from ancora.layout import medir_layout
+from ancora.texto import ascendente
+
+FORMATOS_VETOR = {
+    'svg': {'rotulo': 'SVG', 'extensao': 'svg', 'mime': 'image/svg+xml'},
+    'pdf': {'rotulo': 'PDF', 'extensao': 'pdf', 'mime': 'application/pdf'},
+}
+
+FAMILIA_SVG = "'DejaVu Sans', Verdana, sans-serif"
+
+# Largura da página do PDF em pontos (largura de uma folha A4)
+LARGURA_PDF = 595
+
+# Curva de Bézier que aproxima um quarto de círculo
+KAPPA = 0.5523
+
+CORES_NOMEADAS = {'white': (255, 255, 255)}
+
+
+def _rgb(cor):
+    return CORES_NOMEADAS[cor] if isinstance(cor, str) else cor
+
+
+def _elementos(layout):
+    for secao in layout.secoes:
+        for elemento in secao.fixos + secao.elementos:
+            yield secao.y, elemento
+
+
+# SVG
+
+def _svg_elemento(dy, elemento):
+    tipo = elemento[0]
+    if tipo == 'texto':
+        _, (x, y), texto, (peso, tamanho), cor = elemento
+        negrito = ' font-weight="bold"' if peso == 'bold' else ''
+        return (f'<text x="{x}" y="{y + dy + ascendente((peso, tamanho))}" font-size="{tamanho}"{negrito} '
+                f'fill="rgb{_rgb(cor)}">{escape(texto)}</text>')
+    if tipo == 'retangulo':
+        _, (x0, y0, x1, y1), cor, raio = elemento
+        # O Pillow inclui a borda final (x1, y1) nos retângulos
+        return (f'<rect x="{x0}" y="{y0 + dy}" width="{x1 - x0 + 1}" height="{y1 - y0 + 1}" '
+                f'rx="{raio}" fill="rgb{_rgb(cor)}"/>')
+    _, (x0, y0, x1, y1), cor, largura = elemento
+    return (f'<line x1="{x0}" y1="{y0 + dy}" x2="{x1}" y2="{y1 + dy}" '
+            f'stroke="rgb{_rgb(cor)}" stroke-width="{largura}"/>')
+
+
+def gerar_svg(dados, moedas_selecionadas):
+    layout = medir_layout(dados, moedas_selecionadas)
+    paradas = ''.join(
+        f'<stop offset="{i / (len(CORES_FUNDO) - 1):g}" stop-color="rgb{tuple(cor)}"/>'
+        for i, cor in enumerate(CORES_FUNDO)
+    )
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.largura}" height="{layout.altura}" '
+        f'viewBox="0 0 {layout.largura} {layout.altura}" font-family={quoteattr(FAMILIA_SVG)}>',
+        f'<defs><linearGradient id="fundo">{paradas}</linearGradient></defs>',
+        f'<rect width="{layout.largura}" height="{layout.altura}" fill="url(#fundo)"/>',
+    ]
+    partes += [_svg_elemento(dy, elemento) for dy, elemento in _elementos(layout)]
+    partes.append('</svg>')
+    return '\n'.join(partes).encode('utf-8')
+
+
+# PDF (escrito à mão: fontes padrão Helvetica, sem dependências)
+
+def _pdf_cor(cor, operador):
+    r, g, b = _rgb(cor)
+    return f'{r / 255:.3f} {g / 255:.3f} {b / 255:.3f} {operador}'
+
+
+def _pdf_texto(texto):
+    # Helvetica padrão cobre o português (WinAnsi); emoji e afins ficam de fora
+    bruto = texto.encode('cp1252', 'ignore').strip()
+    return '(' + bruto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)').decode('latin-1') + ')'
+
+
+def _pdf_retangulo(x0, y0, x1, y1, r):
+    # Coordenadas já no sistema do PDF (y0 embaixo, y1 em cima)
+    k = r * KAPPA
+    pontos = [
+        (x0 + r, y0, 'm'),
+        (x1 - r, y0, 'l'), (x1 - r + k, y0, x1, y0 + r - k, x1, y0 + r, 'c'),
+        (x1, y1 - r, 'l'), (x1, y1 - r + k, x1 - r + k, y1, x1 - r, y1, 'c'),
+        (x0 + r, y1, 'l'), (x0 + r - k, y1, x0, y1 - r + k, x0, y1 - r, 'c'),
+        (x0, y0 + r, 'l'), (x0, y0 + r - k, x0 + r - k, y0, x0 + r, y0, 'c'),
+    ]
+    return ' '.join(' '.join(f'{v:.6g}' for v in p[:-1]) + ' ' + p[-1] for p in pontos) + ' h f'
+
+
+def _pdf_elemento(dy, elemento, altura):
+    tipo = elemento[0]
+    if tipo == 'texto':
+        _, (x, y), texto, (peso, tamanho), cor = elemento
+        fonte = '/F2' if peso == 'bold' else '/F1'
+        base = altura - (y + dy + ascendente((peso, tamanho)))
+        return f'{_pdf_cor(cor, "rg")} BT {fonte} {tamanho} Tf {x} {base} Td {_pdf_texto(texto)} Tj ET'
+    if tipo == 'retangulo':
+        _, (x0, y0, x1, y1), cor, raio = elemento
+        return f'{_pdf_cor(cor, "rg")} ' + _pdf_retangulo(x0, altura - (y1 + dy + 1), x1 + 1, altura - (y0 + dy), raio)
+    _, (x0, y0, x1, y1), cor, largura = elemento
+    return f'{_pdf_cor(cor, "RG")} {largura} w {x0} {altura - (y0 + dy)} m {x1} {altura - (y1 + dy)} l S'
+
+
+def _pdf_gradiente(largura):
+    funcoes = [
+        f'<< /FunctionType 2 /Domain [0 1] /C0 [{_pdf_cor(a, "")}] /C1 [{_pdf_cor(b, "")}] /N 1 >>'
+        for a, b in zip(CORES_FUNDO, CORES_FUNDO[1:])
+    ]
+    if len(funcoes) == 1:
+        funcao = funcoes[0]
+    else:
+        n = len(funcoes)
+        limites = ' '.join(f'{i / n:g}' for i in range(1, n))
+        funcao = (f'<< /FunctionType 3 /Domain [0 1] /Functions [{" ".join(funcoes)}] '
+                  f'/Bounds [{limites}] /Encode [{" 0 1" * n}] >>')
+    return (f'<< /ShadingType 2 /ColorSpace /DeviceRGB /Coords [0 0 {largura} 0] '
+            f'/Function {funcao} /Extend [true true] >>')
+
+
+def gerar_pdf(dados, moedas_selecionadas):
+    layout = medir_layout(dados, moedas_selecionadas)
+    largura, altura = layout.largura, layout.altura
+    escala = LARGURA_PDF / largura
+    # Desenha em px e deixa a matriz `cm` converter para pontos
+    comandos = [f'{escala:.6f} 0 0 {escala:.6f} 0 0 cm', f'q 0 0 {largura} {altura} re W n /Fundo sh Q']
+    comandos += [_pdf_elemento(dy, elemento, altura) for dy, elemento in _elementos(layout)]
+    conteudo = zlib.compress('\n'.join(comandos).encode('latin-1'))
+
+    pagina = f'0 0 {LARGURA_PDF} {altura * escala:.2f}'
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        (f'<< /Type /Page /Parent 2 0 R /MediaBox [{pagina}] /Contents 4 0 R '
+         f'/Resources << /Font << /F1 5 0 R /F2 6 0 R >> /Shading << /Fundo 7 0 R >> >> >>').encode('ascii'),
+        f'<< /Length {len(conteudo)} /Filter /FlateDecode >>\nstream\n'.encode('ascii') + conteudo + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        _pdf_gradiente(largura).encode('ascii'),
+    ]
+    saida = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    posicoes = []
+    for i, objeto in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += f'{i} 0 obj\n'.encode('ascii') + objeto + b'\nendobj\n'
+    inicio_xref = len(saida)
+    saida += f'xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n'.encode('ascii')
+    saida += ''.join(f'{p:010d} 00000 n \n' for p in posicoes).encode('ascii')
+    saida += (f'trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\n'
+              f'startxref\n{inicio_xref}\n%%EOF\n').encode('ascii')
+    return bytes(saida)
+
+
+def gerar_vetor(dados, moedas_selecionadas, formato='svg'):
+    if formato == 'svg':
+        return gerar_svg(dados, moedas_selecionadas)
+    if formato == 'pdf':
+        return gerar_pdf(dados, moedas_selecionadas)
+    raise ValueError(f"formato desconhecido: {formato}")
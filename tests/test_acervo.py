@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from ancora.acervo import arquivar_plano, ler_parcelas, ler_preco
+
+PRECOS = [
+    # Formato brasileiro
+    ('R$ 1.200,00', 1200.0),
+    ('R$ 99,90', 99.9),
+    ('3,5', 3.5),
+    ('1.200', 1200.0),
+    ('1.200.000', 1200000.0),
+    ('1.200.000,50', 1200000.5),
+    ('10.000 reais', 10000.0),
+    ('1200', 1200.0),
+    ('R$ 3,5 mil', 3500.0),
+    ('R$ 2k', 2000.0),
+    ('R$ 1.200,', 1200.0),
+    # Formato americano
+    ('12.50', 12.5),
+    ('1,200.50', 1200.5),
+    ('1,200,000', 1200000.0),
+    ('$1,200,000.00', 1200000.0),
+    # Sem valor
+    ('6%', math.nan),
+    ('grátis', math.nan),
+    ('', math.nan),
+    ('1.5.0', math.nan),
+    ('1,5,0', math.nan),
+    ('1,2.3,4', math.nan),
+    ('1.20,5', math.nan),
+]
+
+
+@pytest.mark.parametrize('texto, esperado', PRECOS)
+def test_ler_preco(texto, esperado):
+    valor = ler_preco(texto)
+    if math.isnan(esperado):
+        assert math.isnan(valor)
+    else:
+        assert valor == esperado
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('6x', 6),
+    ('até 12 vezes', 12),
+    ('à vista', 1),
+    ('À Vista', 1),
+    ('', 0),
+    ('99999', 32767),
+])
+def test_ler_parcelas(texto, esperado):
+    assert ler_parcelas(texto) == esperado
+
+
+def test_arquivar_plano_nunca_falha(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANCORA_ACERVO', str(tmp_path))
+    # Prioridade fora do campo de um byte: o registro não monta
+    arquivar_plano({'profissao': 'Dentista', 'preco_principal': '1.5.0'},
+                   {'Indicação': {'prioridade_index': 1000}})
+    assert not (tmp_path / 'planos-v1.bin').exists()